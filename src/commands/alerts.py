@@ -3,7 +3,6 @@ from time import time
 from re import split
 from uuid import uuid4
 from orjson import dumps, OPT_SORT_KEYS
-from aiohttp import ClientSession
 from asyncio import CancelledError
 from traceback import format_exc
 
@@ -12,14 +11,13 @@ from discord.commands import slash_command, SlashCommandGroup, Option
 from discord.ui import View, button, Button
 from discord.errors import NotFound
 
-from google.cloud.firestore import Increment
-
 from helpers.utils import get_incorrect_usage_description
 from helpers import constants
 from assets import static_storage
-from Processor import process_quote_arguments, process_task
+from Processor import process_quote_arguments
+from helpers.processing import process_task
 
-from commands.base import BaseCommand, RedirectView, AuthView
+from commands.base import BaseCommand, RedirectView, AuthView, statistics
 
 
 class AlertCommand(BaseCommand):
@@ -37,7 +35,7 @@ class AlertCommand(BaseCommand):
 		role: Option(Role, "Role to tag on trigger.", name="role", required=False, default=None)
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
 			if request.price_alerts_available():
@@ -73,23 +71,26 @@ class AlertCommand(BaseCommand):
 				count2 = await self.database.collection(f"details/marketAlerts/{request.authorId}").count().get()
 				totalAlertCount += count2[0][0].value
 
+				# The interaction was acknowledged publicly, so limit notices replace it with a followup only the author can see
 				if request.is_registered():
 					if totalAlertCount + len(levels) > 200:
 						embed = Embed(title="You can only create up to 200 price alerts. Remove some before creating new ones by calling </alert list:928980578739568651>", color=constants.colors["gray"])
 						embed.set_author(name="Maximum number of price alerts reached", icon_url=static_storage.error_icon)
-						try: await ctx.respond(embed=embed, view=RedirectView(f"https://www.alpha.bot/account/alerts"), ephemeral=True)
+						try:
+							await ctx.interaction.delete_original_response()
+							await ctx.followup.send(embed=embed, view=RedirectView(f"https://www.alpha.bot/account/alerts"), ephemeral=True)
 						except NotFound: pass
 						return
 				else:
 					if totalAlertCount + len(levels) > 20:
 						embed = Embed(title="Create more than 20 price alerts by authorizing Alpha.bot, or remove some before creating new ones by calling </alert list:928980578739568651>", description="You can increase your limit to 200 by signing up for a free account on [our website](https://www.alpha.bot/sign-up) or via the button below.", color=constants.colors["gray"])
 						embed.set_author(name="Maximum number of price alerts reached", icon_url=static_storage.error_icon)
-						try: await ctx.respond(embed=embed, view=AuthView(redirect="account/alerts"), ephemeral=True)
+						try:
+							await ctx.interaction.delete_original_response()
+							await ctx.followup.send(embed=embed, view=AuthView(redirect="account/alerts"), ephemeral=True)
 						except NotFound: pass
 						return
 
-				await ctx.defer()
-
 				currentPlatform = task.get("currentPlatform")
 				currentTask = task.get(currentPlatform)
 				payload, responseMessage = await process_task(task, "candle", origin=request.origin)
@@ -166,15 +167,8 @@ class AlertCommand(BaseCommand):
 						if currentPlatform == "CCXT":
 							thumbnailUrl = ticker.get("image")
 						else:
-							async with ClientSession() as session:
-								if ticker['exchange'].get("id") is not None and ticker['exchange']['id'] != "forex":
-									url = f"https://api.twelvedata.com/logo?apikey={environ['TWELVEDATA_KEY']}&interval=1min&type={ticker['metadata']['type'].replace(' ', '%20')}&format=JSON&symbol={ticker.get('symbol')}&exchange={ticker['exchange']['name']}"
-								else:
-									url = f"https://api.twelvedata.com/logo?apikey={environ['TWELVEDATA_KEY']}&interval=1min&type={ticker['metadata']['type'].replace(' ', '%20')}&format=JSON&symbol={ticker.get('symbol')}"
-								async with session.get(url) as resp:
-									response = await resp.json()
-									thumbnailUrl = response.get("url")
-									currentTask["ticker"]["image"] = thumbnailUrl
+							thumbnailUrl = await self.fetch_logo(ticker)
+							currentTask["ticker"]["image"] = thumbnailUrl
 
 						newAlerts.append({
 							"timestamp": time(),
@@ -228,7 +222,7 @@ class AlertCommand(BaseCommand):
 						else:
 							await self.database.document(f"details/marketAlerts/{request.authorId}/{alertId}").set(newAlert)
 
-					await self.database.document("discord/statistics").set({request.snapshot: {"alert": Increment(len(levels))}}, merge=True)
+					statistics.increment(request.snapshot, "alert", len(levels))
 					await self.cleanup(ctx, request)
 
 			else:
@@ -249,7 +243,7 @@ class AlertCommand(BaseCommand):
 		ctx
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx, ephemeral=True)
 			if request is None: return
 
 			totalAlertCount = 0
@@ -2,7 +2,6 @@ from os import environ
 from time import time
 from asyncio import sleep
 from re import sub
-from orjson import dumps
 from traceback import format_exc
 
 from discord import Embed, ButtonStyle, Interaction, PartialEmoji
@@ -10,14 +9,21 @@ from discord.ext.commands import Cog
 from discord.ui import View, button, Button
 from google.cloud.firestore import AsyncClient as FirestoreAsyncClient
 from google.cloud.firestore_v1.base_query import FieldFilter
-from google.cloud import pubsub_v1
 
 from helpers import constants
 from assets import static_storage
-from Processor import autocomplete_ticker, autocomplete_venues
+from Processor import autocomplete_venues
+from helpers.autocomplete import complete_ticker, run_autocomplete
+from helpers.layouts import layoutRegistry
+from helpers.statistics import StatisticsAggregator
+from helpers.publishing import EventPublisher
+from helpers.metrics import metrics
+from helpers.logos import LogoCache
 
 database = FirestoreAsyncClient()
-publisher = pubsub_v1.PublisherClient()
+statistics = StatisticsAggregator(database)
+logos = LogoCache(database)
+publisher = EventPublisher()
 REQUESTS_TOPIC_NAME = "projects/nlc-bot-36685/topics/discord-requests"
 TELEMETRY_TOPIC_NAME = "projects/nlc-bot-36685/topics/discord-telemetry"
 
@@ -42,10 +48,23 @@ async def autocomplete_movers_categories(ctx):
 	currentInput = " ".join(ctx.options.get("category", "").lower().split())
 	return [e for e in MARKET_MOVERS_OPTIONS if currentInput in e.lower()]
 
+async def fetch_layout(guildId, label):
+	if layoutRegistry.ready:
+		return layoutRegistry.get(guildId, label)
+	layouts = await database.collection(f"discord/properties/layouts").where(filter=FieldFilter("label", "==", label)).where(filter=FieldFilter("guildId", "==", str(guildId))).get()
+	return None if len(layouts) == 0 else layouts[0].to_dict()
+
 async def autocomplete_layouts(ctx):
-	layouts = await database.collection(f"discord/properties/layouts").where(filter=FieldFilter("guildId", "==", str(ctx.interaction.guild_id))).get()
-	layouts = [e.to_dict()["label"] for e in layouts]
 	currentInput = " ".join(ctx.options.get("name", "").lower().split())
+	if layoutRegistry.ready:
+		return [e for e in layoutRegistry.labels(ctx.interaction.guild_id) if currentInput in e.lower()]
+
+	async def fetch_layouts():
+		layouts = await database.collection(f"discord/properties/layouts").where(filter=FieldFilter("guildId", "==", str(ctx.interaction.guild_id))).get()
+		return [e.to_dict()["label"] for e in layouts]
+
+	# Layouts can be added at any time, so the list is only reused while the user is typing
+	layouts = await run_autocomplete(ctx, ctx.command.qualified_name, "name", None, fetch_layouts, scope=ctx.interaction.guild_id, ttl=15)
 	return [e for e in layouts if currentInput in e.lower()]
 
 
@@ -74,14 +93,34 @@ class BaseCommand(Cog):
 		"paper sell": ["Twelvedata", "CCXT"],
 		"ichibot": ["Ichibot"]
 	}
+	# Commands with a ticker option backed by autocomplete, only their platform lists have a ticker index worth warming up
+	tickerSources = ["alert set", "layout", "p", "convert", "volume", "depth", "info", "lookup listings", "paper buy", "paper sell"]
 
-	def __init__(self, bot, create_request, database, logging):
+	def __init__(self, bot, create_request, database, logging, http, movers):
 		self.bot = bot
 		self.create_request = create_request
 		self.database = database
 		self.logging = logging
-
-	async def log_request(self, command, request, tasks, telemetry=None):
+		self.http = http
+		self.movers = movers
+
+	async def fetch_logo(self, ticker):
+		return await logos.get(self.http, ticker)
+
+	async def prepare_request(self, ctx, autodelete=-1, ephemeral=False):
+		# Acknowledge the interaction before any database work, so that a slow context fetch can never miss the acknowledgement window
+		start = time()
+		try: await ctx.defer(ephemeral=ephemeral)
+		except: return None
+		acknowledgementCheckpoint = time()
+
+		request = await self.create_request(ctx, autodelete=autodelete)
+		if request is None: return None
+		request.set_delay("acknowledgement", acknowledgementCheckpoint - start)
+		return request
+
+	async def log_request(self, command, request, tasks, telemetry=None, cached=0):
+		if telemetry is not None: metrics.observe_request(command, telemetry)
 		if not environ["PRODUCTION"]: return
 		timestamp = int(time())
 		for task in tasks:
@@ -89,7 +128,7 @@ class BaseCommand(Cog):
 			base = currentTask.get("ticker", {}).get("base")
 			if command == "layouts": command += " " + task["TradingView Relay"]["url"]
 			if base is None: base = currentTask.get("ticker", {}).get("id", "")
-			publisher.publish(REQUESTS_TOPIC_NAME, dumps({
+			publisher.publish(REQUESTS_TOPIC_NAME, {
 				"timestamp": timestamp,
 				"command": command,
 				"user": str(request.authorId),
@@ -98,20 +137,24 @@ class BaseCommand(Cog):
 				"base": base,
 				"platform": task.get("currentPlatform"),
 				"count": task.get("requestCount", 1)
-			}))
+			})
 		if telemetry is not None:
-			publisher.publish(TELEMETRY_TOPIC_NAME, dumps({
+			publisher.publish(TELEMETRY_TOPIC_NAME, {
 				"timestamp": timestamp,
 				"command": command,
+				"acknowledgement": telemetry.get("acknowledgement", 0),
 				"database": telemetry["database"],
 				"prelight": telemetry["prelight"],
 				"parser": telemetry["parser"],
 				"request": telemetry["request"],
 				"response": telemetry["response"],
+				"cached": cached,
 				"count": task.get("requestCount", 1)
-			}))
+			})
 
 	async def cleanup(self, ctx, request, removeView=False, persistView=None):
+		# The response was delivered, waiting to clean it up doesn't count as an in-flight interaction
+		metrics.inflight.discard(ctx.interaction.id)
 		if request.autodelete is not None:
 			await sleep(request.autodelete * 60)
 			try: await ctx.interaction.edit_original_response(embeds=[], attachments=[], view=None, content=f"The response has been removed. You can make a new request using {ctx.command.mention}")
@@ -147,8 +190,7 @@ class BaseCommand(Cog):
 		if tickerId == "": return []
 
 		platforms = BaseCommand.sources[command]
-		tickers = await autocomplete_ticker(tickerId, ",".join(platforms))
-		return tickers
+		return await run_autocomplete(ctx, command, mode, tickerId, lambda: complete_ticker(tickerId, ",".join(platforms)))
 
 	@staticmethod
 	async def autocomplete_venues(ctx):
@@ -161,7 +203,7 @@ class BaseCommand(Cog):
 		else: tickerId = " ".join(tickerId.lower().split()).split("|")[0].strip()
 
 		platforms = BaseCommand.sources.get(command)
-		venues = await autocomplete_venues(tickerId, ",".join(platforms))
+		venues = await run_autocomplete(ctx, command, "venue", tickerId, lambda: autocomplete_venues(tickerId, ",".join(platforms)))
 		return sorted([v for v in venues if v.lower().startswith(venue)])
 
 class Confirm(View):
@@ -1,22 +1,27 @@
 from os import environ
 from time import time
+from io import BytesIO
 from random import randint, choice
-from asyncio import gather, CancelledError, sleep
+from asyncio import gather, CancelledError, sleep, Lock
 from traceback import format_exc
 
 from discord import Embed, File, ButtonStyle, SelectOption, Interaction, PartialEmoji
 from discord.commands import slash_command, SlashCommandGroup, Option
 from discord.ui import View, button, Button, Select
 from discord.errors import NotFound
-from google.cloud.firestore import Increment
 
 from helpers.utils import get_incorrect_usage_description
 from helpers import constants
 from assets import static_storage
-from Processor import process_chart_arguments, process_task
+from Processor import process_chart_arguments
+from helpers.processing import process_tasks, expand_timeframes
 from DatabaseConnector import DatabaseConnector
 
-from commands.base import BaseCommand, MediaActionsView, TryV2View
+from commands.base import BaseCommand, MediaActionsView, TryV2View, statistics
+
+
+# Minimum number of seconds between two progressive edits of the same response
+PROGRESSIVE_EDIT_INTERVAL = 1.0
 
 
 class ChartCommand(BaseCommand):
@@ -24,34 +29,38 @@ class ChartCommand(BaseCommand):
 		self,
 		ctx,
 		request,
-		tasks
+		tasks,
+		progressive=False
 	):
 		start = time()
 		files, embeds = [], []
-		for task in tasks:
+		cached = 0
+		jobs = [(task, job) for task in tasks for job in expand_timeframes(task)]
+		delivery = ProgressiveDelivery(ctx, request) if progressive and len(jobs) > 1 else None
+		results = await process_tasks([job for _, job in jobs], "chart", origin=request.origin, callback=None if delivery is None else delivery.push)
+
+		for i, ((task, _), (payload, responseMessage)) in enumerate(zip(jobs, results)):
 			currentTask = task.get(task.get("currentPlatform"))
-			timeframes = task.pop("timeframes")
-			for i in range(task.get("requestCount")):
-				for p, t in timeframes.items(): task[p]["currentTimeframe"] = t[i]
-				payload, responseMessage = await process_task(task, "chart", origin=request.origin)
-
-				if responseMessage == "requires pro":
-					embed = Embed(title=f"The requested chart for `{currentTask.get('ticker').get('name')}` is only available on TradingView Premium.", description="All TradingView Premium charts are bundled with the [Advanced Charting add-on](https://www.alpha.bot/pro/advanced-charting).", color=constants.colors["gray"])
-					embed.set_author(name="TradingView Premium", icon_url=static_storage.error_icon)
-					embeds.append(embed)
-				elif payload is None:
-					errorMessage = f"Requested chart for `{currentTask.get('ticker').get('name')}` is not available." if responseMessage is None else responseMessage
-					embed = Embed(title=errorMessage, color=constants.colors["gray"])
-					embed.set_author(name="Chart not available", icon_url=static_storage.error_icon)
-					embeds.append(embed)
-				else:
-					task["currentPlatform"] = payload.get("platform")
-					currentTask = task.get(task.get("currentPlatform"))
-					files.append(File(payload.get("data"), filename="{:.0f}-{}-{}.png".format(time() * 1000, request.authorId, randint(1000, 9999))))
 
+			if responseMessage == "requires pro":
+				embed = Embed(title=f"The requested chart for `{currentTask.get('ticker').get('name')}` is only available on TradingView Premium.", description="All TradingView Premium charts are bundled with the [Advanced Charting add-on](https://www.alpha.bot/pro/advanced-charting).", color=constants.colors["gray"])
+				embed.set_author(name="TradingView Premium", icon_url=static_storage.error_icon)
+				embeds.append(embed)
+			elif payload is None:
+				errorMessage = f"Requested chart for `{currentTask.get('ticker').get('name')}` is not available." if responseMessage is None else responseMessage
+				embed = Embed(title=errorMessage, color=constants.colors["gray"])
+				embed.set_author(name="Chart not available", icon_url=static_storage.error_icon)
+				embeds.append(embed)
+			else:
+				task["currentPlatform"] = payload.get("platform")
+				if payload.get("cached"): cached += 1
+				if delivery is not None and i in delivery.delivered: continue
+				files.append(File(payload.get("data"), filename="{:.0f}-{}-{}.png".format(time() * 1000, request.authorId, randint(1000, 9999))))
+
+		imageCount = len(files) + (0 if delivery is None else len(delivery.delivered))
 		isLicensed = self.bot.user.id not in constants.PRIMARY_BOTS
 		actions = None
-		if len(files) != 0:
+		if imageCount != 0:
 			isCryptoRequest = any([task.get(task.get("currentPlatform")).get("ticker", {}).get("metadata", {}).get("type") == "Crypto" for task in tasks])
 			if isCryptoRequest and self.bot.user.id in constants.REFERRALS and not request.is_paid_user():
 				referrals = constants.REFERRALS[self.bot.user.id]
@@ -61,24 +70,28 @@ class ChartCommand(BaseCommand):
 				actions = MediaActionsView(user=ctx.author, command=ctx.command.mention, include_v2=not isLicensed)
 
 		requestCheckpoint = time()
-		request.set_delay("request", (requestCheckpoint - start) / (len(files) + len(embeds)))
-		try: await ctx.interaction.edit_original_response(embeds=embeds, files=files, view=actions)
-		except NotFound: pass
+		request.set_delay("request", (requestCheckpoint - start) / (imageCount + len(embeds)))
+		if delivery is None:
+			try: await ctx.interaction.edit_original_response(embeds=embeds, files=files, view=actions)
+			except NotFound: pass
+		else:
+			await delivery.finish(embeds=embeds, files=files, view=actions)
 		request.set_delay("response", time() - requestCheckpoint)
 
-		await self.database.document("discord/statistics").set({request.snapshot: {"c": Increment(len(tasks))}}, merge=True)
-		await self.log_request("charts", request, tasks, telemetry=request.telemetry)
-		await self.cleanup(ctx, request, removeView=True, persistView=TryV2View() if len(files) != 0 and not isLicensed else None)
+		statistics.increment(request.snapshot, "c", len(tasks))
+		await self.log_request("charts", request, tasks, telemetry=request.telemetry, cached=cached)
+		await self.cleanup(ctx, request, removeView=True, persistView=TryV2View() if imageCount != 0 and not isLicensed else None)
 
 	@slash_command(name="c", description="Pull charts from TradingView.")
 	async def c(
 		self,
 		ctx,
 		arguments: Option(str, "Request arguments starting with ticker id.", name="arguments"),
-		autodelete: Option(float, "Bot response self destruct timer in minutes.", name="autodelete", required=False, default=None)
+		autodelete: Option(float, "Bot response self destruct timer in minutes.", name="autodelete", required=False, default=None),
+		progressive: Option(bool, "Post each chart as soon as it's ready.", name="progressive", required=False, default=False)
 	):
 		try:
-			request = await self.create_request(ctx, autodelete=autodelete)
+			request = await self.prepare_request(ctx, autodelete=autodelete)
 			if request is None: return
 
 			platforms = request.get_platform_order_for("c")
@@ -99,10 +112,7 @@ class ChartCommand(BaseCommand):
 				partArguments = part.lower().split()
 				if len(partArguments) == 0: continue
 				tasks.append(process_chart_arguments(partArguments[1:], platforms, tickerId=partArguments[0], defaults=request.guildProperties["charting"]))
-			[results, _] = await gather(
-				gather(*tasks),
-				ctx.defer()
-			)
+			results = await gather(*tasks)
 
 			tasks = []
 			for (responseMessage, task) in results:
@@ -121,15 +131,54 @@ class ChartCommand(BaseCommand):
 				tasks.append(task)
 
 			request.set_delay("parser", time() - prelightCheckpoint)
-			await self.respond(ctx, request, tasks)
+			await self.respond(ctx, request, tasks, progressive=progressive)
 
 		except CancelledError: pass
 		except:
 			print(format_exc())
-			if environ["PRODUCTION"]: self.logging.report_exception(user=f"{ctx.author.id} {ctx.guild.id if ctx.guild is not None else -1}: /c {arguments} autodelete:{autodelete}")
+			if environ["PRODUCTION"]: self.logging.report_exception(user=f"{ctx.author.id} {ctx.guild.id if ctx.guild is not None else -1}: /c {arguments} autodelete:{autodelete} progressive:{progressive}")
 			await self.unknown_error(ctx)
 
 class ReferralView(MediaActionsView):
 	def __init__(self, label, url, user=None, command=None, include_v2=True):
 		super().__init__(user=user, command=command, include_v2=include_v2)
-		self.add_item(Button(label=label, url=url, style=ButtonStyle.link))
\ No newline at end of file
+		self.add_item(Button(label=label, url=url, style=ButtonStyle.link))
+
+class ProgressiveDelivery(object):
+	def __init__(self, ctx, request, interval=PROGRESSIVE_EDIT_INTERVAL):
+		self.ctx = ctx
+		self.request = request
+		self.interval = interval
+		self.pending = []
+		self.delivered = set()
+		self.attachments = []
+		self.lastEdit = 0
+		self.lock = Lock()
+
+	async def push(self, index, result):
+		payload, _ = result
+		if payload is None or payload.get("data") is None: return
+		self.pending.append((index, payload["data"].getvalue()))
+
+		# Charts that finish while an edit is in flight or rate limited are batched into the next edit
+		async with self.lock:
+			if len(self.pending) == 0: return
+			delay = self.lastEdit + self.interval - time()
+			if delay > 0: await sleep(delay)
+
+			pending, self.pending = self.pending, []
+			files = [File(BytesIO(data), filename="{:.0f}-{}-{}.png".format(time() * 1000, self.request.authorId, randint(1000, 9999))) for _, data in pending]
+			try:
+				message = await self.ctx.interaction.edit_original_response(files=files, attachments=self.attachments)
+				self.attachments = message.attachments
+				self.delivered.update([index for index, _ in pending])
+			# Charts that couldn't be delivered are included in the final response instead
+			except: pass
+			self.lastEdit = time()
+
+	async def finish(self, embeds, files, view):
+		async with self.lock:
+			delay = self.lastEdit + self.interval - time()
+			if delay > 0: await sleep(delay)
+			try: await self.ctx.interaction.edit_original_response(embeds=embeds, files=files, attachments=self.attachments, view=view)
+			except NotFound: pass
@@ -1,17 +1,16 @@
 from os import environ
-from asyncio import gather, CancelledError
+from asyncio import CancelledError
 from traceback import format_exc
 
 from discord import Embed
 from discord.commands import slash_command, Option
 from discord.errors import NotFound
-from google.cloud.firestore import Increment
 
 from helpers import constants
 from assets import static_storage
 from Processor import process_conversion
 
-from commands.base import BaseCommand
+from commands.base import BaseCommand, statistics
 
 
 class ConvertCommand(BaseCommand):
@@ -24,14 +23,11 @@ class ConvertCommand(BaseCommand):
 		amount: Option(float, "Amount to convert.", name="amount")
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
 			platforms = request.get_platform_order_for("convert")
-			[(payload, responseMessage), _] = await gather(
-				process_conversion(request, fromTicker, toTicker, amount, platforms),
-				ctx.defer()
-			)
+			payload, responseMessage = await process_conversion(request, fromTicker, toTicker, amount, platforms)
 
 			if payload is None:
 				errorMessage = "Requested conversion is not available." if responseMessage is None else responseMessage
@@ -45,7 +41,7 @@ class ConvertCommand(BaseCommand):
 				try: await ctx.interaction.edit_original_response(embed=embed)
 				except NotFound: pass
 
-			await self.database.document("discord/statistics").set({request.snapshot: {"convert": Increment(1)}}, merge=True)
+			statistics.increment(request.snapshot, "convert", 1)
 
 		except CancelledError: pass
 		except:
@@ -1,21 +1,20 @@
 from os import environ
 from time import time
 from random import randint
-from asyncio import gather, CancelledError
+from asyncio import CancelledError
 from traceback import format_exc
 
 from discord import Embed, File
 from discord.commands import slash_command, Option
 from discord.errors import NotFound
 
-from google.cloud.firestore import Increment
-
 from helpers.utils import get_incorrect_usage_description
 from helpers import constants
 from assets import static_storage
-from Processor import process_quote_arguments, process_task
+from Processor import process_quote_arguments
+from helpers.processing import process_task
 
-from commands.base import BaseCommand
+from commands.base import BaseCommand, statistics
 
 
 class DepthCommand(BaseCommand):
@@ -38,7 +37,7 @@ class DepthCommand(BaseCommand):
 			try: await ctx.interaction.edit_original_response(file=File(payload.get("data"), filename="{:.0f}-{}-{}.png".format(time() * 1000, request.authorId, randint(1000, 9999))))
 			except NotFound: pass
 
-		await self.database.document("discord/statistics").set({request.snapshot: {"d": Increment(1)}}, merge=True)
+		statistics.increment(request.snapshot, "d", 1)
 		await self.log_request("depth", request, [task])
 
 	@slash_command(name="depth", description="Pull orderbook visualization snapshots of stocks and cryptocurrencies.")
@@ -49,14 +48,11 @@ class DepthCommand(BaseCommand):
 		venue: Option(str, "Venue to pull the orderbook from.", name="venue", autocomplete=BaseCommand.autocomplete_venues, required=False, default="")
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
 			platforms = request.get_platform_order_for("d")
-			[(responseMessage, task), _] = await gather(
-				process_quote_arguments([venue], platforms, tickerId=tickerId),
-				ctx.defer()
-			)
+			responseMessage, task = await process_quote_arguments([venue], platforms, tickerId=tickerId)
 
 			if responseMessage is not None:
 				embed = Embed(title=responseMessage, description=get_incorrect_usage_description(self.bot.user.id, "https://www.alpha.bot/features/orderbook-visualizations"), color=constants.colors["gray"])
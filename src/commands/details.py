@@ -6,14 +6,13 @@ from discord import Embed
 from discord.commands import slash_command, Option
 from discord.errors import NotFound
 
-from google.cloud.firestore import Increment
-
 from helpers.utils import get_incorrect_usage_description, add_decimal_zeros
 from helpers import constants
 from assets import static_storage
-from Processor import process_quote_arguments, process_task
+from Processor import process_quote_arguments
+from helpers.processing import process_task
 
-from commands.base import BaseCommand
+from commands.base import BaseCommand, statistics
 
 
 class DetailsCommand(BaseCommand):
@@ -99,7 +98,7 @@ class DetailsCommand(BaseCommand):
 			try: await ctx.respond(embed=embed)
 			except NotFound: pass
 
-		await self.database.document("discord/statistics").set({request.snapshot: {"info": Increment(1)}}, merge=True)
+		statistics.increment(request.snapshot, "info", 1)
 		await self.log_request("details", request, [task])
 
 	@slash_command(name="info", description="Pull up asset information of stocks and cryptocurrencies.")
@@ -109,7 +108,7 @@ class DetailsCommand(BaseCommand):
 		tickerId: Option(str, "Ticker id of an asset.", name="ticker", autocomplete=BaseCommand.autocomplete_ticker)
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
 			platforms = request.get_platform_order_for("info")
@@ -1,20 +1,20 @@
 from os import environ
 from time import time
 from random import randint
-from asyncio import gather, CancelledError
+from asyncio import CancelledError
 from traceback import format_exc
 
 from discord import Embed, File
 from discord.commands import slash_command, Option
 from discord.errors import NotFound
-from google.cloud.firestore import Increment
 
 from helpers.utils import get_incorrect_usage_description
 from helpers import constants
 from assets import static_storage
-from Processor import process_heatmap_arguments, process_task, autocomplete_hmap_timeframe, autocomplete_market, autocomplete_category, autocomplete_size, autocomplete_group
+from Processor import process_heatmap_arguments, autocomplete_hmap_timeframe, autocomplete_market, autocomplete_category, autocomplete_size, autocomplete_group
+from helpers.processing import process_tasks, expand_timeframes
 
-from commands.base import BaseCommand, MediaActionsView, TryV2View, autocomplete_hmap_type
+from commands.base import BaseCommand, MediaActionsView, TryV2View, autocomplete_hmap_type, statistics
 
 
 async def autocomplete_theme(ctx):
@@ -32,20 +32,19 @@ class HeatmapCommand(BaseCommand):
 	):
 		start = time()
 		files, embeds = [], []
-		for task in tasks:
-			currentTask = task.get(task.get("currentPlatform"))
-			timeframes = task.pop("timeframes")
-			for i in range(task.get("requestCount")):
-				for p, t in timeframes.items(): task[p]["currentTimeframe"] = t[i]
-				payload, responseMessage = await process_task(task, "heatmap", origin=request.origin)
-
-				if payload is None:
-					errorMessage = "Requested heatmap is not available." if responseMessage is None else responseMessage
-					embed = Embed(title=errorMessage, color=constants.colors["gray"])
-					embed.set_author(name="Heatmap not available", icon_url=static_storage.error_icon)
-					embeds.append(embed)
-				else:
-					files.append(File(payload.get("data"), filename="{:.0f}-{}-{}.png".format(time() * 1000, request.authorId, randint(1000, 9999))))
+		cached = 0
+		jobs = [job for task in tasks for job in expand_timeframes(task)]
+		results = await process_tasks(jobs, "heatmap", origin=request.origin)
+
+		for payload, responseMessage in results:
+			if payload is None:
+				errorMessage = "Requested heatmap is not available." if responseMessage is None else responseMessage
+				embed = Embed(title=errorMessage, color=constants.colors["gray"])
+				embed.set_author(name="Heatmap not available", icon_url=static_storage.error_icon)
+				embeds.append(embed)
+			else:
+				if payload.get("cached"): cached += 1
+				files.append(File(payload.get("data"), filename="{:.0f}-{}-{}.png".format(time() * 1000, request.authorId, randint(1000, 9999))))
 
 		isLicensed = self.bot.user.id not in constants.PRIMARY_BOTS
 		actions = None
@@ -61,8 +60,8 @@ class HeatmapCommand(BaseCommand):
 		except NotFound: pass
 		request.set_delay("response", time() - requestCheckpoint)
 
-		await self.database.document("discord/statistics").set({request.snapshot: {"hmap": Increment(len(tasks))}}, merge=True)
-		await self.log_request("hmap", request, tasks, telemetry=request.telemetry)
+		statistics.increment(request.snapshot, "hmap", len(tasks))
+		await self.log_request("hmap", request, tasks, telemetry=request.telemetry, cached=cached)
 		await self.cleanup(ctx, request)
 
 	@slash_command(name="hmap", description="Pull market heatmaps from TradingView.")
@@ -79,7 +78,7 @@ class HeatmapCommand(BaseCommand):
 		autodelete: Option(float, "Bot response self destruct timer in minutes.", name="autodelete", required=False, default=None)
 	):
 		try:
-			request = await self.create_request(ctx, autodelete=autodelete)
+			request = await self.prepare_request(ctx, autodelete=autodelete)
 			if request is None: return
 
 			platforms = request.get_platform_order_for("hmap", assetType=assetType)
@@ -88,10 +87,7 @@ class HeatmapCommand(BaseCommand):
 			request.set_delay("prelight", prelightCheckpoint - request.start)
 
 			arguments = [assetType, timeframe, market, category, size, group, theme]
-			[(responseMessage, task), _] = await gather(
-				process_heatmap_arguments(arguments, platforms),
-				ctx.defer()
-			)
+			responseMessage, task = await process_heatmap_arguments(arguments, platforms)
 
 			if responseMessage is not None:
 				embed = Embed(title=responseMessage, description=get_incorrect_usage_description(self.bot.user.id, "https://www.alpha.bot/features/heatmaps"), color=constants.colors["gray"])
@@ -1,22 +1,21 @@
 from os import environ
 from time import time
 from random import randint
-from asyncio import gather, CancelledError, sleep
+from asyncio import CancelledError, sleep
 from traceback import format_exc
 
 from discord import Embed, File, ButtonStyle, SelectOption, Interaction, PartialEmoji
 from discord.commands import slash_command, Option
 from discord.ui import View, button, Button, Select
 from discord.errors import NotFound
-from google.cloud.firestore import Increment
-from google.cloud.firestore_v1.base_query import FieldFilter
 
 from helpers.utils import get_incorrect_usage_description
 from helpers import constants
 from assets import static_storage
-from Processor import autocomplete_layout_timeframe, process_chart_arguments, process_task
+from Processor import autocomplete_layout_timeframe, process_chart_arguments
+from helpers.processing import process_tasks, expand_timeframes
 
-from commands.base import BaseCommand, ActionsView, autocomplete_layouts
+from commands.base import BaseCommand, ActionsView, autocomplete_layouts, fetch_layout, statistics
 from commands.ichibot import Ichibot
 
 
@@ -31,25 +30,21 @@ class LayoutCommand(BaseCommand):
 		venue: Option(str, "Venue to pull the chart from.", name="venue", autocomplete=BaseCommand.autocomplete_venues, required=False, default="")
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
 			prelightCheckpoint = time()
 			request.set_delay("prelight", prelightCheckpoint - request.start)
 
-			[layout, _] = await gather(
-				self.database.collection(f"discord/properties/layouts").where(filter=FieldFilter("label", "==", name)).where(filter=FieldFilter("guildId", "==", str(request.guildId))).get(),
-				ctx.defer()
-			)
+			layout = await fetch_layout(request.guildId, name)
 
-			if len(layout) == 0:
+			if layout is None:
 				embed = Embed(title="Layout not found", description=get_incorrect_usage_description(self.bot.user.id, "https://www.alpha.bot/features/layouts"), color=constants.colors["gray"])
 				embed.set_author(name="Invalid argument", icon_url=static_storage.error_icon)
 				try: await ctx.interaction.edit_original_response(embed=embed)
 				except NotFound: pass
 				return
 
-			layout = layout[0].to_dict()
 			theme = layout.get("theme")
 			isWide = layout.get("isWide", False)
 
@@ -82,14 +77,14 @@ class LayoutCommand(BaseCommand):
 		if request.tradingview_layouts_available():
 			start = time()
 			files, embeds = [], []
+			cached = 0
 
 			task["TradingView Relay"]["url"] = url
 
-			currentTask = task.get(task.get("currentPlatform"))
-			timeframes = task.pop("timeframes")
-			for i in range(task.get("requestCount")):
-				for p, t in timeframes.items(): task[p]["currentTimeframe"] = t[i]
-				payload, responseMessage = await process_task(task, "chart", origin=request.origin, timeout=60)
+			results = await process_tasks(expand_timeframes(task), "chart", origin=request.origin, timeout=60)
+
+			for payload, responseMessage in results:
+				currentTask = task.get(task.get("currentPlatform"))
 
 				if payload is None:
 					errorMessage = f"Requested chart for `{currentTask.get('ticker').get('name')}` is not available." if responseMessage is None else responseMessage
@@ -99,6 +94,7 @@ class LayoutCommand(BaseCommand):
 				else:
 					task["currentPlatform"] = payload.get("platform")
 					currentTask = task.get(task.get("currentPlatform"))
+					if payload.get("cached"): cached += 1
 					files.append(File(payload.get("data"), filename="{:.0f}-{}-{}.png".format(time() * 1000, request.authorId, randint(1000, 9999))))
 
 					# RwU79szBNJUFmrpQbgj3ZtnLmwA2
@@ -116,8 +112,8 @@ class LayoutCommand(BaseCommand):
 			except NotFound: pass
 			request.set_delay("response", time() - requestCheckpoint)
 
-			await self.database.document("discord/statistics").set({request.snapshot: {"c": Increment(1)}}, merge=True)
-			await self.log_request("layouts", request, [task], telemetry=request.telemetry)
+			statistics.increment(request.snapshot, "c", 1)
+			await self.log_request("layouts", request, [task], telemetry=request.telemetry, cached=cached)
 			await self.cleanup(ctx, request, removeView=True)
 
 		else:
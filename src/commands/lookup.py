@@ -1,23 +1,21 @@
 from os import environ
 from time import time
 from random import randint
-from asyncio import gather, CancelledError
-from aiohttp import ClientSession
+from asyncio import CancelledError
 from traceback import format_exc
 
 from discord import Embed, ButtonStyle, Interaction, File
 from discord.commands import SlashCommandGroup, Option
 from discord.ui import View, button, Button
 from discord.errors import NotFound
-from google.cloud.firestore import Increment
-from pycoingecko import CoinGeckoAPI
 
 from helpers.utils import get_incorrect_usage_description
 from helpers import constants
 from assets import static_storage
-from Processor import process_chart_arguments, process_quote_arguments, process_task, get_listings
+from Processor import process_chart_arguments, process_quote_arguments, get_listings
+from helpers.processing import process_task
 
-from commands.base import BaseCommand, ActionsView, autocomplete_fgi_type, autocomplete_movers_categories, MARKET_MOVERS_OPTIONS
+from commands.base import BaseCommand, ActionsView, autocomplete_fgi_type, autocomplete_movers_categories, MARKET_MOVERS_OPTIONS, statistics
 
 
 class LookupCommand(BaseCommand):
@@ -30,7 +28,7 @@ class LookupCommand(BaseCommand):
 		tickerId: Option(str, "Ticker id of an asset.", name="ticker", autocomplete=BaseCommand.autocomplete_ticker)
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
 			platforms = request.get_platform_order_for("lookup")
@@ -61,7 +59,7 @@ class LookupCommand(BaseCommand):
 				try: await ctx.respond(embed=embed)
 				except NotFound: pass
 
-			await self.database.document("discord/statistics").set({request.snapshot: {"mk": Increment(1)}}, merge=True)
+			statistics.increment(request.snapshot, "mk", 1)
 
 		except CancelledError: pass
 		except:
@@ -77,11 +75,9 @@ class LookupCommand(BaseCommand):
 		limit: Option(int, "Asset count limit. Defaults to top 250 by market cap, maximum is 1000.", name="limit", required=False, default=250)
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
-			await ctx.defer()
-
 			category = " ".join(category.lower().split()).replace("etf", "ETF")
 			if category not in MARKET_MOVERS_OPTIONS:
 				embed = Embed(title="The specified category is invalid.", description=get_incorrect_usage_description(self.bot.user.id, "https://www.alpha.bot/features/lookup"), color=constants.colors["deep purple"])
@@ -94,47 +90,13 @@ class LookupCommand(BaseCommand):
 			market = " ".join(parts).lower()
 			embed = Embed(title=f"Top {category}", color=constants.colors["deep purple"])
 
-			if market == "crypto":
-				rawData = []
-				cg = CoinGeckoAPI(api_key=environ["COINGECKO_API_KEY"])
-				page = 1
-				while True:
-					rawData += cg.get_coins_markets(vs_currency="usd", order="market_cap_desc", per_page=250, page=page, price_change_percentage="24h")
-					page += 1
-					if page > 4: break
-
-				response = []
-				for e in rawData[:max(10, limit)]:
-					if e.get("price_change_percentage_24h_in_currency", None) is not None:
-						response.append({"name": e["name"], "symbol": e["symbol"].upper(), "change": e["price_change_percentage_24h_in_currency"]})
-
-				if direction == "gainers":
-					response = sorted(response, key=lambda k: k["change"], reverse=True)
-				elif direction == "losers":
-					response = sorted(response, key=lambda k: k["change"])
-
-				for token in response[:9]:
-					embed.add_field(name=f"{token['name']} (`{token['symbol'].replace('/', '')}`)", value="{:+,.2f}%".format(token["change"]), inline=True)
-
-				try: await ctx.interaction.edit_original_response(embed=embed)
-				except NotFound: pass
-
-			else:
-				async with ClientSession() as session:
-					url = f"https://api.twelvedata.com/market_movers/{market.replace(' ', '_')}?apikey={environ['TWELVEDATA_KEY']}&direction={direction}&outputsize=50"
-					async with session.get(url) as resp:
-						response = await resp.json()
-						assets = filter(
-							lambda e: not e['name'].lower().startswith("test") and "testfund" not in e['name'].lower().replace(" ", ""),
-							response["values"]
-						)
-						for asset in list(assets)[:9]:
-							embed.add_field(name=f"{asset['name']} (`{asset['symbol'].replace('/', '')}`)", value="{:+,.2f}%".format(asset["percent_change"]), inline=True)
+			for asset in await self.movers.get(market, direction, limit):
+				embed.add_field(name=f"{asset['name']} (`{asset['symbol'].replace('/', '')}`)", value="{:+,.2f}%".format(asset["change"]), inline=True)
 
-				try: await ctx.interaction.edit_original_response(embed=embed)
-				except NotFound: pass
+			try: await ctx.interaction.edit_original_response(embed=embed)
+			except NotFound: pass
 
-			await self.database.document("discord/statistics").set({request.snapshot: {"t": Increment(1)}}, merge=True)
+			statistics.increment(request.snapshot, "t", 1)
 
 		except CancelledError: pass
 		except:
@@ -149,7 +111,7 @@ class LookupCommand(BaseCommand):
 		assetType: Option(str, "Fear & greed market type", name="market", autocomplete=autocomplete_fgi_type, required=False, default=""),
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
 			if assetType != "":
@@ -165,10 +127,7 @@ class LookupCommand(BaseCommand):
 					return
 
 			platforms = request.get_platform_order_for("c")
-			[(_, task), _] = await gather(
-				process_chart_arguments([assetType], platforms, tickerId="FGI"),
-				ctx.defer()
-			)
+			_, task = await process_chart_arguments([assetType], platforms, tickerId="FGI")
 
 			currentTask = task.get(task.get("currentPlatform"))
 			timeframes = task.pop("timeframes")
@@ -195,7 +154,7 @@ class LookupCommand(BaseCommand):
 			try: await ctx.interaction.edit_original_response(embeds=embeds, files=files, view=actions)
 			except NotFound: pass
 
-			await self.database.document("discord/statistics").set({request.snapshot: {"c": Increment(1)}}, merge=True)
+			statistics.increment(request.snapshot, "c", 1)
 			await self.log_request("charts", request, [task])
 			await self.cleanup(ctx, request, removeView=True)
 
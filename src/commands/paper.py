@@ -1,7 +1,6 @@
 from os import environ
 from time import time
 from uuid import uuid4
-from aiohttp import ClientSession
 from asyncio import gather, CancelledError, wait, create_task
 from traceback import format_exc
 
@@ -9,15 +8,16 @@ from discord import Embed, ButtonStyle, Interaction
 from discord.commands import SlashCommandGroup, Option
 from discord.ui import View, button, Button
 from discord.errors import NotFound
-from google.cloud.firestore import Increment, DELETE_FIELD
+from google.cloud.firestore import DELETE_FIELD
 
 from helpers import constants
 from assets import static_storage
 from helpers.utils import get_incorrect_usage_description, timestamp_to_date
-from Processor import process_quote_arguments, process_task, match_ticker, process_conversion, get_formatted_price_ccxt, get_formatted_amount_ccxt
+from Processor import process_quote_arguments, match_ticker, process_conversion, get_formatted_price_ccxt, get_formatted_amount_ccxt
+from helpers.processing import process_task
 from DatabaseConnector import DatabaseConnector
 
-from commands.base import BaseCommand, Confirm, AuthView
+from commands.base import BaseCommand, Confirm, AuthView, statistics
 
 
 class PaperCommand(BaseCommand):
@@ -103,7 +103,7 @@ class PaperCommand(BaseCommand):
 			try: await ctx.interaction.edit_original_response(embed=embed)
 			except NotFound: pass
 
-		await self.database.document("discord/statistics").set({request.snapshot: {"paper": Increment(1)}}, merge=True)
+		statistics.increment(request.snapshot, "paper", 1)
 
 	async def paper_order_proxy(
 		self,
@@ -114,7 +114,7 @@ class PaperCommand(BaseCommand):
 		orderType
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
 			if level is not None:
@@ -124,10 +124,7 @@ class PaperCommand(BaseCommand):
 				return
 
 			platforms = request.get_platform_order_for("paper")
-			[(responseMessage, task), _] = await gather(
-				process_quote_arguments([], platforms, tickerId=tickerId),
-				ctx.defer()
-			)
+			responseMessage, task = await process_quote_arguments([], platforms, tickerId=tickerId)
 
 			if responseMessage is not None:
 				embed = Embed(title=responseMessage, description=get_incorrect_usage_description(self.bot.user.id, "https://www.alpha.bot/features/paper-trading"), color=constants.colors["gray"])
@@ -183,11 +180,9 @@ class PaperCommand(BaseCommand):
 		ctx,
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
-			await ctx.defer()
-
 			paper = request.accountProperties.get("paperTrader", {})
 			paperBalances = paper.get("balance", {})
 
@@ -314,7 +309,7 @@ class PaperCommand(BaseCommand):
 		ctx
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
 			paperHistory = await self.database.collection(f"details/paperOrderHistory/{request.accountId}").limit(50).get()
@@ -408,7 +403,7 @@ class PaperCommand(BaseCommand):
 		ctx,
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx, ephemeral=True)
 			if request is None: return
 
 			paper = request.accountProperties.get("paperTrader", {})
@@ -507,14 +502,7 @@ class PaperCommand(BaseCommand):
 		else:
 			execPriceText = "{:,.6f}".format(execPrice)
 			execAmountText = "{:,.6f}".format(execAmount)
-			async with ClientSession() as session:
-				if ticker['exchange'].get("id") is not None and ticker['exchange']['id'] != "forex":
-					url = f"https://api.twelvedata.com/logo?apikey={environ['TWELVEDATA_KEY']}&interval=1min&type={ticker['metadata']['type'].replace(' ', '%20')}&format=JSON&symbol={ticker.get('symbol')}&exchange={ticker['exchange']['name']}"
-				else:
-					url = f"https://api.twelvedata.com/logo?apikey={environ['TWELVEDATA_KEY']}&interval=1min&type={ticker['metadata']['type'].replace(' ', '%20')}&format=JSON&symbol={ticker.get('symbol')}"
-				async with session.get(url) as resp:
-					response = await resp.json()
-					thumbnailUrl = response.get("url")
+			thumbnailUrl = await self.fetch_logo(ticker)
 
 		baseValue = execAmount
 		quoteValue = execAmount * execPrice
@@ -6,14 +6,14 @@ from traceback import format_exc
 from discord import Embed
 from discord.commands import slash_command, Option
 from discord.errors import NotFound
-from google.cloud.firestore import Increment
 
 from helpers.utils import get_incorrect_usage_description
 from helpers import constants
 from assets import static_storage
-from Processor import process_quote_arguments, process_task
+from Processor import process_quote_arguments
+from helpers.processing import process_tasks
 
-from commands.base import BaseCommand
+from commands.base import BaseCommand, statistics
 
 
 class PriceCommand(BaseCommand):
@@ -25,9 +25,10 @@ class PriceCommand(BaseCommand):
 	):
 		start = time()
 		embeds = []
-		for task in tasks:
+		results = await process_tasks(tasks, "quote", origin=request.origin)
+
+		for task, (payload, responseMessage) in zip(tasks, results):
 			currentTask = task.get(task.get("currentPlatform"))
-			payload, responseMessage = await process_task(task, "quote", origin=request.origin)
 
 			if payload is None or "quotePrice" not in payload:
 				errorMessage = f"Requested quote for `{currentTask.get('ticker').get('name')}` is not available." if responseMessage is None else responseMessage
@@ -38,11 +39,11 @@ class PriceCommand(BaseCommand):
 				if payload.get("platform") in ["Alternative.me", "CNN Business"]:
 					embed = Embed(title=f"{payload['quotePrice']} *({payload['change']})*", description=payload.get("quoteConvertedPrice"), color=constants.colors[payload["messageColor"]])
 					embed.set_author(name=payload["title"], icon_url=payload.get("thumbnailUrl"))
-					embed.set_footer(text=payload["sourceText"])
+					embed.set_footer(text=payload["sourceText"] + (" (refreshing)" if payload.get("stale") else ""))
 				else:
 					embed = Embed(title="{}{}".format(payload["quotePrice"], f" *({payload['change']})*" if "change" in payload else ""), description=payload.get("quoteConvertedPrice"), color=constants.colors[payload["messageColor"]])
 					embed.set_author(name=payload["title"], icon_url=payload.get("thumbnailUrl"))
-					embed.set_footer(text=payload["sourceText"])
+					embed.set_footer(text=payload["sourceText"] + (" (refreshing)" if payload.get("stale") else ""))
 
 			embeds.append(embed)
 
@@ -52,7 +53,7 @@ class PriceCommand(BaseCommand):
 		except NotFound: pass
 		request.set_delay("response", time() - requestCheckpoint)
 
-		await self.database.document("discord/statistics").set({request.snapshot: {"p": Increment(len(tasks))}}, merge=True)
+		statistics.increment(request.snapshot, "p", len(tasks))
 		await self.log_request("prices", request, tasks, telemetry=request.telemetry)
 
 	@slash_command(name="p", description="Fetch stock and crypto prices, forex rates, and other instrument data. Command for power users.")
@@ -62,7 +63,7 @@ class PriceCommand(BaseCommand):
 		arguments: Option(str, "Request arguments starting with ticker id.", name="arguments")
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
 			platforms = request.get_platform_order_for("p")
@@ -83,10 +84,7 @@ class PriceCommand(BaseCommand):
 				partArguments = part.lower().split()
 				if len(partArguments) == 0: continue
 				tasks.append(process_quote_arguments(partArguments[1:], platforms, tickerId=partArguments[0]))
-			[results, _] = await gather(
-				gather(*tasks),
-				ctx.defer()
-			)
+			results = await gather(*tasks)
 
 			tasks = []
 			for (responseMessage, task) in results:
@@ -115,17 +113,14 @@ class PriceCommand(BaseCommand):
 		venue: Option(str, "Venue to pull the price from.", name="venue", autocomplete=BaseCommand.autocomplete_venues, required=False, default="")
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
 			prelightCheckpoint = time()
 			request.set_delay("prelight", prelightCheckpoint - request.start)
 
 			platforms = request.get_platform_order_for("p")
-			[(responseMessage, task), _] = await gather(
-				process_quote_arguments([venue], platforms, tickerId=tickerId),
-				ctx.defer()
-			)
+			responseMessage, task = await process_quote_arguments([venue], platforms, tickerId=tickerId)
 
 			if responseMessage is not None:
 				embed = Embed(title=responseMessage, description=get_incorrect_usage_description(self.bot.user.id, "https://www.alpha.bot/features/prices"), color=constants.colors["gray"])
@@ -1,11 +1,9 @@
 from os import environ
 from time import time
 from uuid import uuid4
-from datetime import datetime, timedelta
-from parsedatetime import Calendar
+from datetime import datetime
 from random import randint
 from asyncio import gather, CancelledError
-from aiohttp import ClientSession
 from traceback import format_exc
 
 from discord import Embed, File, ButtonStyle, SelectOption, Interaction, Role, Thread, Permissions
@@ -13,21 +11,19 @@ from discord.commands import slash_command, SlashCommandGroup, Option
 from discord.ui import View, button, Button, Select
 from discord.errors import NotFound
 from google.cloud.firestore import Increment
-from google.cloud.firestore_v1.base_query import FieldFilter
-from pycoingecko import CoinGeckoAPI
 
 from helpers.utils import get_incorrect_usage_description
 from helpers import constants
 from assets import static_storage
-from Processor import process_chart_arguments, process_heatmap_arguments, process_quote_arguments, process_task, autocomplete_hmap_timeframe, autocomplete_market, autocomplete_category, autocomplete_size, autocomplete_group, autocomplete_layout_timeframe
+from Processor import process_chart_arguments, process_heatmap_arguments, process_quote_arguments, autocomplete_hmap_timeframe, autocomplete_market, autocomplete_category, autocomplete_size, autocomplete_group, autocomplete_layout_timeframe
+from helpers.processing import process_task
+from helpers.scheduling import suggest_dates
 from commands.heatmaps import autocomplete_theme
 from DatabaseConnector import DatabaseConnector
 
-from commands.base import BaseCommand, RedirectView, Confirm, autocomplete_fgi_type, autocomplete_hmap_type, autocomplete_movers_categories, autocomplete_layouts, MARKET_MOVERS_OPTIONS
+from commands.base import BaseCommand, RedirectView, Confirm, autocomplete_fgi_type, autocomplete_hmap_type, autocomplete_movers_categories, autocomplete_layouts, fetch_layout, MARKET_MOVERS_OPTIONS
 
 
-cal = Calendar()
-
 PERIODS = ["5 minutes", "10 minutes", "15 minutes", "20 minutes", "30 minutes", "1 hour", "2 hours", "3 hours", "4 hours", "6 hours", "8 hours", "12 hours", "1 day"]
 PERIOD_TO_TIME = {"5 minutes": 5, "10 minutes": 10, "15 minutes": 15, "20 minutes": 20, "30 minutes": 30, "1 hour": 60, "2 hours": 120, "3 hours": 180, "4 hours": 240, "6 hours": 360, "8 hours": 480, "12 hours": 720, "1 day": 1440}
 TIME_TO_PERIOD = {value: key for key, value in PERIOD_TO_TIME.items()}
@@ -45,15 +41,8 @@ def autocomplete_period(ctx):
 
 def autocomplete_date(ctx):
 	date = " ".join(ctx.options.get("start", "").lower().split())
-	if date == "":
-		options = [datetime.now().strftime("%b %d %Y %H:%M") + " UTC"]
-		return options
-	else:
-		timeStructs, _ = cal.parse(date)
-		parsed = datetime(*timeStructs[:5])
-		if parsed < datetime.now(): parsed += timedelta(days=1)
-		options = [parsed.strftime("%b %d %Y %H:%M") + " UTC"]
-		return options
+	period = PERIOD_TO_TIME.get(ctx.options.get("period"))
+	return suggest_dates(date, period)
 
 def autocomplete_exclude(ctx):
 	exclude = " ".join(ctx.options.get("exclude", "").lower().split())
@@ -79,12 +68,9 @@ class ScheduleCommand(BaseCommand):
 		role: Option(Role, "Role to tag on trigger.", name="role", required=False, default=None)
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx, ephemeral=True)
 			if request is None: return
 
-			try: await ctx.defer(ephemeral=True)
-			except: return
-
 			inThread = isinstance(ctx.channel, Thread)
 			totalPostCount = await self.database.collection(f"details/scheduledPosts/{request.guildId}").count().get()
 
@@ -247,12 +233,9 @@ class ScheduleCommand(BaseCommand):
 		role: Option(Role, "Role to tag on trigger.", name="role", required=False, default=None)
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx, ephemeral=True)
 			if request is None: return
 
-			try: await ctx.defer(ephemeral=True)
-			except: return
-
 			inThread = isinstance(ctx.channel, Thread)
 			totalPostCount = await self.database.collection(f"details/scheduledPosts/{request.guildId}").count().get()
 
@@ -301,10 +284,16 @@ class ScheduleCommand(BaseCommand):
 				arguments = [venue, timeframe]
 				[(responseMessage, task), layout] = await gather(
 					process_chart_arguments(arguments, ["TradingView Relay"], tickerId=tickerId, defaults=request.guildProperties["charting"]),
-					self.database.collection(f"discord/properties/layouts").where(filter=FieldFilter("label", "==", name)).where(filter=FieldFilter("guildId", "==", str(request.guildId))).get()
+					fetch_layout(request.guildId, name)
 				)
 
-				if responseMessage is not None:
+				if layout is None:
+					embed = Embed(title="Layout not found", description=get_incorrect_usage_description(self.bot.user.id, "https://www.alpha.bot/features/layouts"), color=constants.colors["gray"])
+					embed.set_author(name="Invalid argument", icon_url=static_storage.error_icon)
+					try: await ctx.interaction.edit_original_response(embed=embed)
+					except NotFound: pass
+					return
+				elif responseMessage is not None:
 					embed = Embed(title=responseMessage, description=get_incorrect_usage_description(self.bot.user.id, "https://www.alpha.bot/features/layouts"), color=constants.colors["gray"])
 					embed.set_author(name="Invalid argument", icon_url=static_storage.error_icon)
 					try: await ctx.interaction.edit_original_response(embed=embed)
@@ -317,7 +306,7 @@ class ScheduleCommand(BaseCommand):
 					except NotFound: pass
 					return
 
-				url = layout[0].to_dict()["url"]
+				url = layout["url"]
 				task["TradingView Relay"]["url"] = url
 
 				currentTask = task.get(task.get("currentPlatform"))
@@ -412,12 +401,9 @@ class ScheduleCommand(BaseCommand):
 		role: Option(Role, "Role to tag on trigger.", name="role", required=False, default=None)
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx, ephemeral=True)
 			if request is None: return
 
-			try: await ctx.defer(ephemeral=True)
-			except: return
-
 			inThread = isinstance(ctx.channel, Thread)
 			totalPostCount = await self.database.collection(f"details/scheduledPosts/{request.guildId}").count().get()
 
@@ -567,12 +553,9 @@ class ScheduleCommand(BaseCommand):
 		role: Option(Role, "Role to tag on trigger.", name="role", required=False, default=None)
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx, ephemeral=True)
 			if request is None: return
 
-			try: await ctx.defer(ephemeral=True)
-			except: return
-
 			inThread = isinstance(ctx.channel, Thread)
 			totalPostCount = await self.database.collection(f"details/scheduledPosts/{request.guildId}").count().get()
 
@@ -723,12 +706,9 @@ class ScheduleCommand(BaseCommand):
 		role: Option(Role, "Role to tag on trigger.", name="role", required=False, default=None)
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx, ephemeral=True)
 			if request is None: return
 
-			try: await ctx.defer(ephemeral=True)
-			except: return
-
 			inThread = isinstance(ctx.channel, Thread)
 			totalPostCount = await self.database.collection(f"details/scheduledPosts/{request.guildId}").count().get()
 
@@ -873,12 +853,9 @@ class ScheduleCommand(BaseCommand):
 		role: Option(Role, "Role to tag on trigger.", name="role", required=False, default=None)
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx, ephemeral=True)
 			if request is None: return
 
-			try: await ctx.defer(ephemeral=True)
-			except: return
-
 			inThread = isinstance(ctx.channel, Thread)
 			totalPostCount = await self.database.collection(f"details/scheduledPosts/{request.guildId}").count().get()
 
@@ -936,39 +913,8 @@ class ScheduleCommand(BaseCommand):
 				market = " ".join(parts)
 				embed = Embed(title=f"Top {category}", color=constants.colors["deep purple"])
 
-				if market == "crypto":
-					rawData = []
-					cg = CoinGeckoAPI(api_key=environ["COINGECKO_API_KEY"])
-					page = 1
-					while True:
-						rawData += cg.get_coins_markets(vs_currency="usd", order="market_cap_desc", per_page=250, page=page, price_change_percentage="24h")
-						page += 1
-						if page > 4: break
-
-					response = []
-					for e in rawData[:max(10, limit)]:
-						if e.get("price_change_percentage_24h_in_currency", None) is not None:
-							response.append({"name": e["name"], "symbol": e["symbol"].upper(), "change": e["price_change_percentage_24h_in_currency"]})
-
-					if direction == "gainers":
-						response = sorted(response, key=lambda k: k["change"], reverse=True)
-					elif direction == "losers":
-						response = sorted(response, key=lambda k: k["change"])
-
-					for token in response[:9]:
-						embed.add_field(name=f"{token['name']} (`{token['symbol'].replace('/', '')}`)", value="{:+,.2f}%".format(token["change"]), inline=True)
-
-				else:
-					async with ClientSession() as session:
-						url = f"https://api.twelvedata.com/market_movers/{market.replace(' ', '_')}?apikey={environ['TWELVEDATA_KEY']}&direction={direction}&outputsize=50"
-						async with session.get(url) as resp:
-							response = await resp.json()
-							assets = filter(
-								lambda e: not e['name'].lower().startswith("test") and "testfund" not in e['name'].lower().replace(" ", ""),
-								response["values"]
-							)
-							for asset in list(assets)[:9]:
-								embed.add_field(name=f"{asset['name']} (`{asset['symbol'].replace('/', '')}`)", value="{:+,.2f}%".format(asset["percent_change"]), inline=True)
+				for asset in await self.movers.get(market.lower(), direction.lower(), limit):
+					embed.add_field(name=f"{asset['name']} (`{asset['symbol'].replace('/', '')}`)", value="{:+,.2f}%".format(asset["change"]), inline=True)
 
 				embeds = [embed]
 
@@ -1045,12 +991,9 @@ class ScheduleCommand(BaseCommand):
 		role: Option(Role, "Role to tag on trigger.", name="role", required=False, default=None)
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx, ephemeral=True)
 			if request is None: return
 
-			try: await ctx.defer(ephemeral=True)
-			except: return
-
 			inThread = isinstance(ctx.channel, Thread)
 			totalPostCount = await self.database.collection(f"details/scheduledPosts/{request.guildId}").count().get()
 
@@ -1205,7 +1148,7 @@ class ScheduleCommand(BaseCommand):
 	@scheduleGroup.command(name="list", description="List all scheduled posts.")
 	async def schedule_list(self, ctx):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx, ephemeral=True)
 			if request is None: return
 
 			totalPostCount = await self.database.collection(f"details/scheduledPosts/{request.guildId}").count().get()
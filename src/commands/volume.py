@@ -1,18 +1,18 @@
 from os import environ
-from asyncio import gather, CancelledError
+from asyncio import CancelledError
 from traceback import format_exc
 
 from discord import Embed
 from discord.commands import slash_command, Option
 from discord.errors import NotFound
-from google.cloud.firestore import Increment
 
 from helpers.utils import get_incorrect_usage_description
 from helpers import constants
 from assets import static_storage
-from Processor import process_quote_arguments, process_task
+from Processor import process_quote_arguments
+from helpers.processing import process_task
 
-from commands.base import BaseCommand
+from commands.base import BaseCommand, statistics
 
 
 class VolumeCommand(BaseCommand):
@@ -35,11 +35,11 @@ class VolumeCommand(BaseCommand):
 			currentTask = task.get(payload.get("platform"))
 			embed = Embed(title=payload["quoteVolume"], description=payload.get("quoteConvertedVolume"), color=constants.colors["orange"])
 			embed.set_author(name=payload["title"], icon_url=payload.get("thumbnailUrl"))
-			embed.set_footer(text=payload["sourceText"])
+			embed.set_footer(text=payload["sourceText"] + (" (refreshing)" if payload.get("stale") else ""))
 			try: await ctx.interaction.edit_original_response(embed=embed)
 			except NotFound: pass
 
-		await self.database.document("discord/statistics").set({request.snapshot: {"v": Increment(1)}}, merge=True)
+		statistics.increment(request.snapshot, "v", 1)
 		await self.log_request("volume", request, [task])
 
 	@slash_command(name="volume", description="Fetch stock and crypto 24-hour volume.")
@@ -50,14 +50,11 @@ class VolumeCommand(BaseCommand):
 		venue: Option(str, "Venue to pull the volume from.", name="venue", autocomplete=BaseCommand.autocomplete_venues, required=False, default="")
 	):
 		try:
-			request = await self.create_request(ctx)
+			request = await self.prepare_request(ctx)
 			if request is None: return
 
 			platforms = request.get_platform_order_for("v")
-			[(responseMessage, task), _] = await gather(
-				process_quote_arguments([venue], platforms, tickerId=tickerId),
-				ctx.defer()
-			)
+			responseMessage, task = await process_quote_arguments([venue], platforms, tickerId=tickerId)
 
 			if responseMessage is not None:
 				embed = Embed(title=responseMessage, description=get_incorrect_usage_description(self.bot.user.id, "https://www.alpha.bot/features/volume"), color=constants.colors["gray"])
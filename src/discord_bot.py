@@ -3,9 +3,12 @@ environ["PRODUCTION"] = environ["PRODUCTION"] if "PRODUCTION" in environ and env
 botId = -1 if len(environ["HOSTNAME"].split("-")) != 3 else int(environ["HOSTNAME"].split("-")[-1])
 
 from time import time
+from copy import deepcopy
 from datetime import datetime, timezone
-from requests import post
-from asyncio import CancelledError, sleep, gather, wait, create_task
+from signal import SIGTERM
+from random import uniform
+from asyncio import CancelledError, sleep, gather, create_task, Semaphore
+from aiohttp import ClientConnectionError
 from traceback import format_exc
 
 from discord import AutoShardedBot, Embed, Intents, CustomActivity, Status, ActivityType, MessageType
@@ -15,14 +18,25 @@ from google.cloud.firestore import AsyncClient as FirestoreAsyncClient
 from google.cloud.firestore import Client as FirestoreClient
 from google.cloud.firestore import Increment
 from google.cloud.firestore import Query
+from google.cloud.firestore import FieldPath, DELETE_FIELD
 from google.cloud.error_reporting import Client as ErrorReportingClient
 
 from assets import static_storage
 from helpers import constants
+from helpers.cache import LRUCache, TTLCache
+from helpers.layouts import layoutRegistry
+from helpers.metrics import metrics, start_server
+from helpers.monitoring import LoopMonitor
+from helpers.http import HTTPClient
+from helpers.movers import MarketMovers
+from helpers.delivery import DeliveryQueue
+from helpers.processing import taskFlights, imageCache, quoteCache, quoteStats
+from helpers.autocomplete import refresh_ticker_indexes, tickerFlights, resultCache, inputStats
 
 from DatabaseConnector import DatabaseConnector
 from CommandRequest import CommandRequest
 
+from commands.base import BaseCommand, statistics, publisher, logos
 from commands.alerts import AlertCommand
 from commands.charts import ChartCommand
 from commands.convert import ConvertCommand
@@ -41,6 +55,8 @@ from commands.volume import VolumeCommand
 
 database = FirestoreAsyncClient()
 logging = ErrorReportingClient(service="discord")
+http = HTTPClient()
+movers = MarketMovers(http)
 snapshots = FirestoreClient()
 
 
@@ -62,6 +78,13 @@ bot = AutoShardedBot(intents=intents, chunk_guilds_at_startup=False, max_message
 # Guild count & management
 # -------------------------
 
+GUILD_COUNT_DEBOUNCE = 300
+GUILD_COUNT_RETRIES = 4
+GUILD_COUNT_BACKOFF = 5
+PAID_GUILD_CONCURRENCY = 5
+# Guild details are fetched again once they're older than this many seconds
+PAID_GUILD_TTL = 3 * 24 * 60 * 60
+
 @bot.event
 async def on_guild_join(guild):
 	# Method should not run on licensed bots
@@ -77,7 +100,7 @@ async def on_guild_join(guild):
 		properties.pop("connection", None)
 		properties = CommandRequest.create_guild_settings(properties)
 		await database.document(f"discord/properties/guilds/{guild.id}").set(properties)
-		await update_guild_count()
+		schedule_guild_count()
 	except:
 		print(format_exc())
 		if environ["PRODUCTION"]: logging.report_exception(user=str(guild.id))
@@ -89,24 +112,55 @@ async def on_guild_remove(guild):
 		print(f"{bot.user.name} Bot ({bot.user.id}) left {guild.name} ({guild.id})")
 		return
 
-	try:
-		await update_guild_count()
-	except:
-		print(format_exc())
-		if environ["PRODUCTION"]: logging.report_exception(user=str(guild.id))
+	schedule_guild_count()
+	if str(guild.id) in settings.get("nicknames", {}):
+		settings["nicknames"].pop(str(guild.id))
+		nicknameChanges[str(guild.id)] = None
+
+@bot.event
+async def on_guild_update(before, after):
+	if bot.user.id not in constants.PRIMARY_BOTS: return
+	if before.name != after.name: track_nickname(after)
+
+def schedule_guild_count():
+	# Joins and leaves come in bursts, they're coalesced into a single report
+	global pendingGuildCount
+	if pendingGuildCount is not None and not pendingGuildCount.done(): return
+	pendingGuildCount = create_task(report_guild_count(delay=GUILD_COUNT_DEBOUNCE))
 
 @tasks.loop(hours=8.0)
 async def update_guild_count():
-	await bot.wait_until_ready()
+	await report_guild_count()
 
-	# Method should not run on licensed bots
-	if bot.user.id not in constants.PRIMARY_BOTS: return
-	# Method should only run in production and after the guild cache is populated
-	if not environ["PRODUCTION"] or len(bot.guilds) < 25000: return
+async def report_guild_count(delay=0):
+	try:
+		await sleep(delay)
+		await bot.wait_until_ready()
 
-	t = datetime.now().astimezone(timezone.utc)
-	await database.document("discord/statistics").set({"{}-{:02d}".format(t.year, t.month): {"servers": len(bot.guilds)}}, merge=True)
-	post(f"https://top.gg/api/bots/{bot.user.id}/stats", data={"server_count": len(bot.guilds)}, headers={"Authorization": environ["TOPGG_KEY"]})
+		# Method should not run on licensed bots
+		if bot.user.id not in constants.PRIMARY_BOTS: return
+		# Method should only run in production and after the guild cache is populated
+		if not environ["PRODUCTION"] or len(bot.guilds) < 25000: return
+
+		t = datetime.now().astimezone(timezone.utc)
+		await database.document("discord/statistics").set({"{}-{:02d}".format(t.year, t.month): {"servers": len(bot.guilds)}}, merge=True)
+		await post_guild_count(len(bot.guilds))
+	except CancelledError: pass
+	except:
+		print(format_exc())
+		if environ["PRODUCTION"]: logging.report_exception()
+
+async def post_guild_count(count):
+	for attempt in range(GUILD_COUNT_RETRIES):
+		try:
+			async with http.post(f"https://top.gg/api/bots/{bot.user.id}/stats", data={"server_count": count}, headers={"Authorization": environ["TOPGG_KEY"]}) as resp:
+				# Only rate limits and server errors are worth retrying
+				if resp.status == 429 or resp.status >= 500: raise ClientConnectionError(f"top.gg responded with {resp.status}")
+				resp.raise_for_status()
+				return
+		except (ClientConnectionError, TimeoutError):
+			if attempt == GUILD_COUNT_RETRIES - 1: raise
+			await sleep(GUILD_COUNT_BACKOFF * 2 ** attempt)
 
 @tasks.loop(hours=12.0)
 async def update_paid_guilds():
@@ -122,9 +176,9 @@ async def update_paid_guilds():
 	BLACKLIST = ["ebOX1w1N2DgMtXVN978fnL0FKCP2"]
 
 	try:
+		global paidGuildsShowcase
 		response = await database.collection("accounts").order_by("customer.subscriptions", direction=Query.DESCENDING).limit(200).get()
-		ids = set()
-		guilds = []
+		ids = []
 
 		for account in response:
 			if account.id in BLACKLIST: continue
@@ -133,15 +187,26 @@ async def update_paid_guilds():
 			for feature in properties["customer"]["slots"]:
 				for guildId in properties["customer"]["slots"][feature].keys():
 					if guildId != "personal" and guildId not in ids:
-						ids.add(guildId)
-						try: guild = await bot.fetch_guild(int(guildId), with_counts=True)
-						except: continue
-						guilds.append(guild)
-
-		guilds.sort(key=lambda g: g.approximate_member_count, reverse=True)
-		icons = [{"url": g.icon.url, "name": g.name, "members": g.approximate_member_count} for g in guilds if g is not None and g.icon is not None]
-
+						ids.append(guildId)
+
+		semaphore = Semaphore(PAID_GUILD_CONCURRENCY)
+		async def fetch_paid_guild(guildId):
+			# Only guilds without fresh details are fetched, the REST client waits out rate limits on its own
+			cached = paidGuildCache.get(guildId)
+			if cached is not None: return cached
+			async with semaphore:
+				try: guild = await bot.fetch_guild(int(guildId), with_counts=True)
+				except: return None
+			details = False if guild.icon is None else {"url": guild.icon.url, "name": guild.name, "members": guild.approximate_member_count}
+			paidGuildCache.set(guildId, details)
+			return details
+
+		guilds = await gather(*[fetch_paid_guild(guildId) for guildId in ids])
+		icons = sorted([g for g in guilds if g], key=lambda g: g["members"], reverse=True)
+
+		if icons == paidGuildsShowcase: return
 		await database.document("examples/servers").set({"paid": icons})
+		paidGuildsShowcase = icons
 	except:
 		print(format_exc())
 		if environ["PRODUCTION"]: logging.report_exception()
@@ -155,6 +220,76 @@ def update_settings(s, changes, timestamp):
 	global settings
 	settings = s[0].to_dict()
 
+def update_guild_cache(pendingGuilds, changes, timestamp):
+	try:
+		for change in changes:
+			if change.type.name == "REMOVED":
+				guildCache.pop(change.document.id)
+			else:
+				guildCache.update(change.document.id, CommandRequest.create_guild_settings(change.document.to_dict()))
+	except:
+		print(format_exc())
+		if environ["PRODUCTION"]: logging.report_exception()
+
+def update_account_cache(pendingAccounts, changes, timestamp):
+	try:
+		for change in changes:
+			accountId = change.document.id
+			properties = change.document.to_dict() if change.type.name != "REMOVED" else {}
+			userId = properties.get("oauth", {}).get("discord", {}).get("userId")
+
+			previousUserId = accountLinks.pop(accountId, None)
+			if previousUserId is not None and previousUserId != userId:
+				accountCache.pop(previousUserId)
+			if userId is None: continue
+
+			accountLinks[accountId] = userId
+			accountCache.update(userId, (accountId, properties))
+			unlinkedUsers.pop(userId)
+	except:
+		print(format_exc())
+		if environ["PRODUCTION"]: logging.report_exception()
+
+def update_layout_registry(pendingLayouts, changes, timestamp):
+	try:
+		layoutRegistry.update(changes)
+	except:
+		print(format_exc())
+		if environ["PRODUCTION"]: logging.report_exception()
+
+async def fetch_account_properties(authorId):
+	key = str(authorId)
+	cached = accountCache.get(key)
+	if cached is not None:
+		return cached[0], deepcopy(cached[1])
+	# Most users have no linked account, skip the match lookup until the entry expires or the account gets linked
+	if unlinkedUsers.get(key) is not None:
+		return None, await accountProperties.get(key, {})
+
+	[accountId, user] = await gather(
+		accountProperties.match(authorId),
+		accountProperties.get(key, {})
+	)
+	# Only linked accounts are kept up to date by the snapshot listener
+	if accountId is not None:
+		accountLinks[accountId] = key
+		accountCache.add(key, (accountId, deepcopy(user)))
+	else:
+		unlinkedUsers.add(key, True)
+	return accountId, user
+
+async def fetch_guild_properties(guildId):
+	if guildId == -1: return await guildProperties.get(guildId, {})
+
+	key = str(guildId)
+	cached = guildCache.get(key)
+	if cached is not None:
+		return deepcopy(cached)
+
+	guild = await guildProperties.get(guildId, {})
+	guildCache.add(key, deepcopy(guild))
+	return guild
+
 
 # -------------------------
 # Message processing
@@ -164,21 +299,24 @@ def process_messages(pendingMessages, changes, timestamp):
 	# Method should only run in production
 	if not environ["PRODUCTION"]: return
 
-	try:
-		for change in changes:
+	for change in changes:
+		# A malformed document only skips itself, not the rest of the batch
+		try:
 			message = change.document.to_dict()
 			if change.type.name in ["ADDED", "MODIFIED"]:
-				bot.loop.create_task(send_messages(change.document.id, message))
+				# Messages addressed to other bots are skipped early once the bot's identity is known
+				if bot.user is not None and message.get("botId") != str(bot.user.id): continue
+				deliveryQueue.submit(bot.loop, change.document.id, message)
 
-	except:
-		print(format_exc())
-		if environ["PRODUCTION"]: logging.report_exception()
+		except:
+			print(format_exc())
+			if environ["PRODUCTION"]: logging.report_exception()
 
 async def send_messages(messageId, message):
 	await bot.wait_until_ready()
 
 	# Method should only run if the message is addressed to the right bot
-	if message["botId"] != str(bot.user.id): return
+	if message.get("botId") != str(bot.user.id): return
 
 	try:
 		print(f"Sending message: {messageId}")
@@ -253,12 +391,13 @@ async def send_messages(messageId, message):
 			except:
 				print(format_exc())
 
-		print("Could not send message to any destination.")
-
 	except:
 		print(format_exc())
 		if environ["PRODUCTION"]: logging.report_exception()
 
+	# Every delivered message returns early, so the delivery queue can count the ones that didn't make it
+	raise RuntimeError(f"Could not send message {messageId} to any destination.")
+
 
 # -------------------------
 # Job functions
@@ -274,34 +413,59 @@ async def security_check():
 	if len(bot.guilds) < 25000: return
 
 	try:
-		guildIds = [str(e.id) for e in bot.guilds]
+		for guildId in constants.bannedGuilds:
+			guild = bot.get_guild(guildId)
+			if guild is not None: await guild.leave()
 
-		for guildId in list(settings["nicknames"].keys()):
-			if guildId not in guildIds:
+		# Entries of guilds the bot left while it was offline, nickname changes themselves are tracked from commands and guild updates
+		for guildId in list(settings.get("nicknames", {}).keys()):
+			if bot.get_guild(int(guildId)) is None:
 				settings["nicknames"].pop(guildId)
+				nicknameChanges[guildId] = None
 
-		for guild in bot.guilds:
-			if guild.id in constants.bannedGuilds:
-				await guild.leave()
+	except CancelledError: pass
+	except:
+		print(format_exc())
+		if environ["PRODUCTION"]: logging.report_exception()
 
-			guildId = str(guild.id)
-			if guild.me is not None:
-				if guildId in settings["nicknames"]:
-					if guild.me.nick is None or guild.me.nick in settings["nicknameWhitelist"]:
-						settings["nicknames"].pop(guildId)
-					elif settings["nicknames"][guildId].get("nickname") != guild.me.nick or settings["nicknames"][guildId]["server name"] != guild.name:
-						settings["nicknames"][guildId] = {"nickname": guild.me.nick, "server name": guild.name, "allowed": None}
-				elif guild.me.nick is not None and guild.me.nick not in settings["nicknameWhitelist"]:
-					settings["nicknames"][guildId] = {"nickname": guild.me.nick, "server name": guild.name, "allowed": None}
+def track_nickname(guild):
+	# Nothing is tracked until the settings snapshot arrived, as it would replace any entry recorded before it
+	if guild is None or guild.me is None or "nicknames" not in settings: return
+	guildId = str(guild.id)
+	current = settings["nicknames"].get(guildId)
 
-		if environ["PRODUCTION"]:
-			await database.document("discord/settings").set(settings)
+	if guild.me.nick is None or guild.me.nick in settings.get("nicknameWhitelist", []):
+		expected = None
+	elif current is not None and current.get("nickname") == guild.me.nick and current.get("server name") == guild.name:
+		expected = current
+	else:
+		expected = {"nickname": guild.me.nick, "server name": guild.name, "allowed": None}
+
+	if expected is current: return
+	if expected is None: settings["nicknames"].pop(guildId, None)
+	else: settings["nicknames"][guildId] = expected
+	nicknameChanges[guildId] = expected
 
+@tasks.loop(minutes=1.0)
+async def flush_nicknames():
+	global nicknameChanges
+	if len(nicknameChanges) == 0: return
+	changes, nicknameChanges = nicknameChanges, {}
+
+	try:
+		# Only the entries that changed are written, instead of the whole settings document
+		if environ["PRODUCTION"]:
+			await database.document("discord/settings").update({FieldPath("nicknames", guildId).to_api_repr(): DELETE_FIELD if entry is None else entry for guildId, entry in changes.items()})
 	except CancelledError: pass
 	except:
+		for guildId, entry in changes.items(): nicknameChanges.setdefault(guildId, entry)
 		print(format_exc())
 		if environ["PRODUCTION"]: logging.report_exception()
 
+SANITY_READ_CONCURRENCY = 20
+# Firestore batches are limited to 500 operations
+SANITY_BATCH_SIZE = 500
+
 @tasks.loop(minutes=15.0)
 async def database_sanity_check():
 	await bot.wait_until_ready()
@@ -312,26 +476,80 @@ async def database_sanity_check():
 	if not environ["PRODUCTION"] or len(bot.guilds) < 25000: return
 
 	try:
-		databaseKeys = set(await guildProperties.keys())
+		global sanityCursor
+		databaseKeys = await guildProperties.keys()
 		if databaseKeys is None: return
+		databaseKeys = set(databaseKeys)
 
 		guilds = set([str(g.id) for g in bot.guilds])
-		difference = guilds.symmetric_difference(databaseKeys)
+		difference = sorted(guilds.symmetric_difference(databaseKeys))
+		# An interrupted run continues after the last committed batch
+		if sanityCursor is not None: difference = [guildId for guildId in difference if guildId > sanityCursor]
+		sanityProgress.update({"runs": sanityProgress["runs"] + 1, "pending": len(difference), "processed": 0, "written": 0})
+
+		semaphore = Semaphore(SANITY_READ_CONCURRENCY)
+		async def fetch_missing(guildId):
+			if guildId in databaseKeys: return None
+			async with semaphore:
+				return await guild_secure_fetch(guildId)
+
+		# Every guild produces at most one write, so a chunk never exceeds the batch limit
+		for i in range(0, len(difference), SANITY_BATCH_SIZE):
+			chunk = difference[i:i + SANITY_BATCH_SIZE]
+			properties = await gather(*[fetch_missing(guildId) for guildId in chunk])
+
+			batch = database.batch()
+			operations = 0
+			for guildId, fetched in zip(chunk, properties):
+				if guildId not in guilds and int(guildId) not in constants.LICENSED_BOTS:
+					batch.set(database.document(f"discord/properties/guilds/{guildId}"), {"stale": {"count": Increment(1), "timestamp": time()}}, merge=True)
+					operations += 1
+				elif guildId not in databaseKeys and not fetched:
+					batch.set(database.document(f"discord/properties/guilds/{guildId}"), CommandRequest.create_guild_settings({}))
+					operations += 1
+			if operations > 0: await batch.commit()
+
+			sanityCursor = chunk[-1]
+			sanityProgress["processed"] += len(chunk)
+			sanityProgress["pending"] -= len(chunk)
+			sanityProgress["written"] += operations
+
+		sanityCursor = None
+
+	except:
+		print(format_exc())
+		if environ["PRODUCTION"]: logging.report_exception()
 
-		tasks = []
-		for guildId in difference:
-			if guildId not in guilds and int(guildId) not in constants.LICENSED_BOTS:
-				tasks.append(create_task(database.document(f"discord/properties/guilds/{guildId}").set({"stale": {"count": Increment(1), "timestamp": time()}}, merge=True)))
+@tasks.loop(minutes=1.0)
+async def flush_statistics():
+	try:
+		await statistics.flush()
+	except CancelledError: pass
+	except:
+		print(format_exc())
+		if environ["PRODUCTION"]: logging.report_exception()
 
-		for guildId in difference:
-			if guildId not in databaseKeys:
-				properties = await guild_secure_fetch(guildId)
-				if not properties:
-					tasks.append(create_task(database.document(f"discord/properties/guilds/{guildId}").set(CommandRequest.create_guild_settings({}))))
+@flush_statistics.before_loop
+async def stagger_statistics():
+	# Spread flushes of all bot processes across the interval, so they don't contend on the same document
+	await sleep(uniform(0, 60))
 
-		if len(tasks) > 0:
-			await wait(tasks)
+@tasks.loop(minutes=5.0)
+async def refresh_market_movers():
+	try:
+		await movers.refresh_all()
+	except CancelledError: pass
+	except:
+		print(format_exc())
+		if environ["PRODUCTION"]: logging.report_exception()
+
+@tasks.loop(hours=1.0)
+async def refresh_ticker_index():
+	await bot.wait_until_ready()
 
+	try:
+		await refresh_ticker_indexes(set([",".join(BaseCommand.sources[command]) for command in BaseCommand.tickerSources]))
+	except CancelledError: pass
 	except:
 		print(format_exc())
 		if environ["PRODUCTION"]: logging.report_exception()
@@ -360,10 +578,7 @@ async def on_message(message):
 		# Ignore if user is banned
 		if message.author.id in constants.blockedUsers: return
 
-		[accountId, user] = await gather(
-			accountProperties.match(message.author.id),
-			accountProperties.get(str(message.author.id), {})
-		)
+		accountId, user = await fetch_account_properties(message.author.id)
 
 		commandRequest = CommandRequest(
 			raw=message.clean_content,
@@ -377,7 +592,7 @@ async def on_message(message):
 		# Ichibot should not run on licensed bots
 		if bot.user.id in constants.PRIMARY_BOTS and commandRequest.content.startswith("x ") and message.guild is not None:
 			await process_ichibot_command(message, commandRequest, commandRequest.content.split(" ", 1)[1])
-			await database.document("discord/statistics").set({_snapshot: {"x": Increment(1)}}, merge=True)
+			statistics.increment(_snapshot, "x")
 
 	except CancelledError: pass
 	except:
@@ -438,15 +653,14 @@ async def create_request(ctx, autodelete=-1):
 	channelId = ctx.channel.id if ctx.channel is not None else -1
 
 	# Ignore if user if locked in a prompt, or banned
-	if authorId in constants.blockedUsers or guildId in constants.blockedGuilds: return
+	if authorId in constants.blockedUsers or guildId in constants.blockedGuilds: return await discard_request(ctx)
 
 	# Check if the bot has the permission to operate in this guild
-	if bot.user.id not in constants.PRIMARY_BOTS and guildId not in constants.LICENSED_BOTS: return
+	if bot.user.id not in constants.PRIMARY_BOTS and guildId not in constants.LICENSED_BOTS: return await discard_request(ctx)
 
-	[accountId, user, guild] = await gather(
-		accountProperties.match(authorId),
-		accountProperties.get(str(authorId), {}),
-		guildProperties.get(guildId, {})
+	[(accountId, user), guild] = await gather(
+		fetch_account_properties(authorId),
+		fetch_guild_properties(guildId)
 	)
 	databaseCheckpoint = time()
 
@@ -462,8 +676,12 @@ async def create_request(ctx, autodelete=-1):
 	)
 	request.set_delay("database", databaseCheckpoint - start)
 
+	if request.guildId != -1 and bot.user.id in constants.PRIMARY_BOTS:
+		# Member updates aren't received without the members intent, so commands are where nickname changes get noticed
+		track_nickname(ctx.guild)
+
 	if request.guildId != -1 and bot.user.id == 401328409499664394:
-		branding = settings["nicknames"].get(str(request.guildId), {"allowed": True, "nickname": None})
+		branding = settings.get("nicknames", {}).get(str(request.guildId), {"allowed": True, "nickname": None})
 		if branding["allowed"] == False and ctx.guild.me.nick == branding["nickname"]:
 			embed = Embed(title="This Discord community guild was flagged for re-branding Alpha.bot and is therefore violating the Terms of Service.", description="Note that you are allowed to change the nickname of the bot as long as it is neutral. If you wish to present the bot with your own branding, you have to purchase a [Bot License](https://www.alpha.bot/pro/bot-license). Alpha.bot will continue to operate normally, if you remove the nickname.", color=0x000000)
 			embed.add_field(name="Terms of service", value="[Read now](https://www.alpha.bot/terms-of-service)", inline=True)
@@ -489,31 +707,38 @@ async def create_request(ctx, autodelete=-1):
 
 	return request
 
+async def discard_request(ctx):
+	# Remove the loading state of interactions that were acknowledged before the request got rejected
+	if ctx.interaction.response.is_done():
+		try: await ctx.interaction.delete_original_response()
+		except: pass
+	return None
+
 
 # -------------------------
 # Slash commands
 # -------------------------
 
-bot.add_cog(AlertCommand(bot, create_request, database, logging))
-bot.add_cog(ChartCommand(bot, create_request, database, logging))
-bot.add_cog(ConvertCommand(bot, create_request, database, logging))
-bot.add_cog(DepthCommand(bot, create_request, database, logging))
-bot.add_cog(DetailsCommand(bot, create_request, database, logging))
-# bot.add_cog(FlowCommand(bot, create_request, database, logging))
-bot.add_cog(HeatmapCommand(bot, create_request, database, logging))
-bot.add_cog(LayoutCommand(bot, create_request, database, logging))
-bot.add_cog(LookupCommand(bot, create_request, database, logging))
-bot.add_cog(PaperCommand(bot, create_request, database, logging))
-bot.add_cog(PriceCommand(bot, create_request, database, logging))
-bot.add_cog(ScheduleCommand(bot, create_request, database, logging))
-bot.add_cog(VolumeCommand(bot, create_request, database, logging))
+bot.add_cog(AlertCommand(bot, create_request, database, logging, http, movers))
+bot.add_cog(ChartCommand(bot, create_request, database, logging, http, movers))
+bot.add_cog(ConvertCommand(bot, create_request, database, logging, http, movers))
+bot.add_cog(DepthCommand(bot, create_request, database, logging, http, movers))
+bot.add_cog(DetailsCommand(bot, create_request, database, logging, http, movers))
+# bot.add_cog(FlowCommand(bot, create_request, database, logging, http, movers))
+bot.add_cog(HeatmapCommand(bot, create_request, database, logging, http, movers))
+bot.add_cog(LayoutCommand(bot, create_request, database, logging, http, movers))
+bot.add_cog(LookupCommand(bot, create_request, database, logging, http, movers))
+bot.add_cog(PaperCommand(bot, create_request, database, logging, http, movers))
+bot.add_cog(PriceCommand(bot, create_request, database, logging, http, movers))
+bot.add_cog(ScheduleCommand(bot, create_request, database, logging, http, movers))
+bot.add_cog(VolumeCommand(bot, create_request, database, logging, http, movers))
 
 # -------------------------
 # Special commands
 # -------------------------
 
 if botId == -1:
-	bot.add_cog(IchibotCommand(bot, create_request, database, logging))
+	bot.add_cog(IchibotCommand(bot, create_request, database, logging, http, movers))
 
 
 # -------------------------
@@ -536,8 +761,61 @@ accountProperties = DatabaseConnector(mode="account")
 guildProperties = DatabaseConnector(mode="guild")
 Ichibot.logging = logging
 
+# Property caches are only fed by snapshot listeners on the main bot, licensed bots read through
+accountCache = LRUCache(maxsize=20000 if botId == -1 else 0)
+guildCache = LRUCache(maxsize=40000 if botId == -1 else 0)
+# The main pod requests 1800Mi, licensed bots only 100Mi and don't cache rendered images at all
+imageCache.maxbytes = 200 * 1024 * 1024 if botId == -1 else 0
+accountLinks = {}
+unlinkedUsers = TTLCache(ttl=300, maxsize=200000 if botId == -1 else 0)
+loopMonitor = LoopMonitor(logging)
+pendingGuildCount = None
+paidGuildCache = TTLCache(ttl=PAID_GUILD_TTL, maxsize=5000)
+paidGuildsShowcase = None
+sanityCursor = None
+nicknameChanges = {}
+sanityProgress = {"runs": 0, "pending": 0, "processed": 0, "written": 0}
+
+deliveryQueue = DeliveryQueue(send_messages)
+deliveryQueue.start(bot.loop)
+
 discordSettingsLink = snapshots.document("discord/settings").on_snapshot(update_settings)
 discordMessagesLink = snapshots.collection("discord/properties/messages").on_snapshot(process_messages)
+if botId == -1:
+	guildPropertiesLink = snapshots.collection("discord/properties/guilds").on_snapshot(update_guild_cache)
+	accountPropertiesLink = snapshots.collection("accounts").on_snapshot(update_account_cache)
+	layoutPropertiesLink = snapshots.collection("discord/properties/layouts").on_snapshot(update_layout_registry)
+
+metrics.register("accounts", accountCache.stats)
+metrics.register("guilds", guildCache.stats)
+metrics.register("unlinked", unlinkedUsers.stats)
+metrics.register("layouts", layoutRegistry.stats)
+metrics.register("images", imageCache.stats)
+metrics.register("quotes", lambda: {**quoteCache.stats(), **quoteStats})
+metrics.register("tasks", taskFlights.stats)
+metrics.register("autocomplete", lambda: {**resultCache.stats(), **inputStats})
+metrics.register("tickers", tickerFlights.stats)
+metrics.register("statistics", statistics.stats)
+metrics.register("publisher", publisher.stats)
+metrics.register("loop", loopMonitor.stats)
+metrics.register("http", http.stats)
+metrics.register("logos", logos.stats)
+metrics.register("sanity", lambda: sanityProgress)
+metrics.register("delivery", deliveryQueue.stats)
+metrics.register_histogram("alpha_message_delivery_seconds", deliveryQueue.latency)
+metrics.register("movers", movers.stats)
+metrics.register_histogram("alpha_http_request_seconds", http.timings)
+
+@bot.before_invoke
+async def track_interaction(ctx):
+	metrics.inflight.add(ctx.interaction.id)
+
+@bot.after_invoke
+async def untrack_interaction(ctx):
+	metrics.inflight.discard(ctx.interaction.id)
+
+def is_ready():
+	return bot.is_ready() and not bot.is_closed() and all([not shard.is_closed() for shard in bot.shards.values()])
 
 @bot.event
 async def on_ready():
@@ -559,8 +837,17 @@ async def on_ready():
 		update_paid_guilds.start()
 	if not security_check.is_running():
 		security_check.start()
+	if not flush_nicknames.is_running():
+		flush_nicknames.start()
 	if not database_sanity_check.is_running():
 		database_sanity_check.start()
+	# Licensed bots run on a small memory budget, their ticker indexes are only filled by lookups
+	if botId == -1 and not refresh_ticker_index.is_running():
+		refresh_ticker_index.start()
+	if not flush_statistics.is_running():
+		flush_statistics.start()
+	if not refresh_market_movers.is_running():
+		refresh_market_movers.start()
 
 	if not environ["PRODUCTION"] or botId == -1:
 		print(f"[Startup]: {bot.user.name} Bot ({bot.user.id}) startup complete")
@@ -590,4 +877,18 @@ elif botId == 4:
 elif botId == 5:
 	token = environ["TOKEN_APIS3KDVEZZRDSA6OIEDO3EZDQ33"]
 
-bot.loop.run_until_complete(bot.start(token))
\ No newline at end of file
+async def shutdown():
+	try: await statistics.flush()
+	except: print(format_exc())
+	await http.close()
+	await bot.close()
+
+bot.loop.add_signal_handler(SIGTERM, lambda: create_task(shutdown()))
+bot.loop.run_until_complete(start_server(is_ready, loopMonitor.stats))
+bot.loop.create_task(loopMonitor.heartbeat())
+try:
+	bot.loop.run_until_complete(bot.start(token))
+finally:
+	# Counters and events accumulated since the last flush are sent before the process exits
+	bot.loop.run_until_complete(statistics.flush())
+	publisher.stop()
\ No newline at end of file
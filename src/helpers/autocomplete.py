@@ -0,0 +1,141 @@
+from re import split
+from time import time
+from bisect import bisect_left, insort
+from asyncio import ensure_future, gather, shield, Semaphore, CancelledError
+from traceback import format_exc
+
+from Processor import autocomplete_ticker
+
+from helpers.processing import SingleFlight
+from helpers.cache import TTLCache
+
+
+WARMUP_PREFIXES = "abcdefghijklmnopqrstuvwxyz0123456789"
+# Local results are served right away once there are at least this many of them
+LOCAL_MINIMUM = 5
+# Prefixes fetched remotely within this many seconds are not fetched again in the background
+FETCH_INTERVAL = 600
+MAX_INDEX_SIZE = 20000
+# Seconds for which autocomplete results are reused for the same command, option and input
+RESULT_TTL = 300
+
+
+class TickerIndex(object):
+	def __init__(self):
+		self.keys = []
+		self.choices = {}
+		self.fetched = {}
+
+	def __len__(self):
+		return len(self.choices)
+
+	def add(self, name, rank, choice):
+		if name in self.choices:
+			# Keep the best position a ticker ever had in remote results
+			if rank < self.choices[name][0]: self.choices[name] = (rank, choice)
+			return
+		if len(self.choices) >= MAX_INDEX_SIZE: return
+		self.choices[name] = (rank, choice)
+		lowered = name.lower()
+		for token in set([lowered] + [e for e in split(r"[^a-z0-9]+", lowered) if e != ""]):
+			insort(self.keys, (token, name))
+
+	def merge(self, query, choices):
+		if len(self.fetched) >= MAX_INDEX_SIZE: self.fetched.clear()
+		self.fetched[query] = time()
+		for rank, choice in enumerate(choices):
+			self.add(str(getattr(choice, "name", choice)), rank, choice)
+
+	def absorb(self, other):
+		# Carries over entries and fetch times collected by another index, keeping the newer of the two
+		for name, (rank, choice) in other.choices.items():
+			self.add(name, rank, choice)
+		for query, timestamp in other.fetched.items():
+			if len(self.fetched) >= MAX_INDEX_SIZE: break
+			if timestamp > self.fetched.get(query, 0): self.fetched[query] = timestamp
+
+	def search(self, prefix, limit=25):
+		matches = set()
+		i = bisect_left(self.keys, (prefix,))
+		while i < len(self.keys) and self.keys[i][0].startswith(prefix):
+			matches.add(self.keys[i][1])
+			i += 1
+		ranked = sorted(matches, key=lambda name: (self.choices[name][0], name))
+		return [self.choices[name][1] for name in ranked[:limit]]
+
+
+tickerIndexes = {}
+tickerFlights = SingleFlight()
+resultCache = TTLCache(ttl=RESULT_TTL, maxsize=20000)
+pendingInputs = {}
+inputStats = {"superseded": 0, "joined": 0}
+
+
+async def run_autocomplete(ctx, command, option, value, factory, scope=None, ttl=None):
+	key = (command, option, value, scope)
+	cached = resultCache.get(key)
+	if cached is not None: return cached
+
+	userKey = (ctx.interaction.user.id, command, option)
+	pending = pendingInputs.get(userKey)
+	if pending is not None and not pending[1].done() and pending[0] == key:
+		# Keystrokes that resolve to the same lookup wait for the call already in flight
+		inputStats["joined"] += 1
+		task = pending[1]
+	else:
+		# A changed input cancels the previous lookup of the same user in the same option, Discord discards its response anyway
+		if pending is not None and not pending[1].done():
+			inputStats["superseded"] += 1
+			pending[1].cancel()
+		task = ensure_future(factory())
+		pendingInputs[userKey] = (key, task)
+
+	try:
+		# Shielded, so that a handler cancelled by the library doesn't cancel the lookup for the other keystrokes sharing it
+		result = await shield(task)
+	except CancelledError:
+		return []
+	finally:
+		if task.done() and pendingInputs.get(userKey, (None, None))[1] is task: pendingInputs.pop(userKey)
+
+	resultCache.set(key, result, ttl=ttl)
+	return result
+
+
+async def fetch_tickers(index, tickerId, platforms):
+	tickers = await tickerFlights.run(f"{platforms}|{tickerId}", lambda: autocomplete_ticker(tickerId, platforms))
+	# The index may have been swapped by a refresh while the lookup was running
+	tickerIndexes.get(platforms, index).merge(tickerId, tickers)
+	return tickers
+
+async def background_fetch(index, tickerId, platforms):
+	try: await fetch_tickers(index, tickerId, platforms)
+	except: print(format_exc())
+
+async def complete_ticker(tickerId, platforms):
+	index = tickerIndexes.setdefault(platforms, TickerIndex())
+	local = index.search(tickerId)
+
+	if len(local) >= LOCAL_MINIMUM:
+		# Answer from memory and let remote results enrich the index for the following keystrokes
+		if index.fetched.get(tickerId, 0) < time() - FETCH_INTERVAL and f"{platforms}|{tickerId}" not in tickerFlights.inflight:
+			ensure_future(background_fetch(index, tickerId, platforms))
+		return local
+
+	return await fetch_tickers(index, tickerId, platforms)
+
+async def refresh_ticker_indexes(platformSets, limit=4):
+	semaphore = Semaphore(limit)
+
+	async def warmup(platforms):
+		index = TickerIndex()
+		for prefix in WARMUP_PREFIXES:
+			async with semaphore:
+				try: index.merge(prefix, await autocomplete_ticker(prefix, platforms))
+				except: print(format_exc())
+		# Swap the index only once it's complete, so lookups never see a partially loaded one, and without losing what was merged live in the meantime
+		current = tickerIndexes.get(platforms)
+		if current is not None: index.absorb(current)
+		tickerIndexes[platforms] = index
+
+	await gather(*[warmup(platforms) for platforms in platformSets])
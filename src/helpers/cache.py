@@ -0,0 +1,175 @@
+from time import monotonic
+from threading import Lock
+from collections import OrderedDict
+
+
+class LRUCache(object):
+	def __init__(self, maxsize=10000):
+		self.maxsize = maxsize
+		self.entries = OrderedDict()
+		self.lock = Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	def __contains__(self, key):
+		return key in self.entries
+
+	def get(self, key):
+		with self.lock:
+			if key not in self.entries:
+				self.misses += 1
+				return None
+			self.entries.move_to_end(key)
+			self.hits += 1
+			return self.entries[key]
+
+	def set(self, key, value):
+		if self.maxsize <= 0: return
+		with self.lock:
+			self.entries[key] = value
+			self.entries.move_to_end(key)
+			self._evict()
+
+	def add(self, key, value):
+		# Insert only if absent, so that a fresher value pushed by a snapshot listener is never overwritten by a slower read
+		if self.maxsize <= 0: return
+		with self.lock:
+			if key in self.entries: return
+			self.entries[key] = value
+			self._evict()
+
+	def update(self, key, value):
+		# Refresh existing entries without touching recency, fill empty slots while the budget allows it
+		if self.maxsize <= 0: return
+		with self.lock:
+			if key in self.entries or len(self.entries) < self.maxsize:
+				self.entries[key] = value
+
+	def pop(self, key):
+		with self.lock:
+			return self.entries.pop(key, None)
+
+	def clear(self):
+		with self.lock:
+			self.entries.clear()
+
+	def _evict(self):
+		while len(self.entries) > self.maxsize:
+			self.entries.popitem(last=False)
+			self.evictions += 1
+
+	def stats(self):
+		total = self.hits + self.misses
+		return {
+			"size": len(self.entries),
+			"maxsize": self.maxsize,
+			"hits": self.hits,
+			"misses": self.misses,
+			"evictions": self.evictions,
+			"ratio": 0 if total == 0 else self.hits / total
+		}
+
+
+class TTLCache(LRUCache):
+	def __init__(self, ttl=60, maxsize=10000):
+		super().__init__(maxsize=maxsize)
+		self.ttl = ttl
+		self.expirations = 0
+
+	def get(self, key):
+		with self.lock:
+			entry = self.entries.get(key)
+			if entry is None:
+				self.misses += 1
+				return None
+			if entry[0] < monotonic():
+				self.entries.pop(key)
+				self.expirations += 1
+				self.misses += 1
+				return None
+			self.entries.move_to_end(key)
+			self.hits += 1
+			return entry[1]
+
+	def set(self, key, value, ttl=None):
+		super().set(key, (monotonic() + (self.ttl if ttl is None else ttl), value))
+
+	def add(self, key, value, ttl=None):
+		super().add(key, (monotonic() + (self.ttl if ttl is None else ttl), value))
+
+	def update(self, key, value, ttl=None):
+		super().update(key, (monotonic() + (self.ttl if ttl is None else ttl), value))
+
+	def pop(self, key):
+		entry = super().pop(key)
+		return None if entry is None else entry[1]
+
+	def stats(self):
+		return {**super().stats(), "ttl": self.ttl, "expirations": self.expirations}
+
+
+class SizedTTLCache(object):
+	def __init__(self, maxbytes=100 * 1024 * 1024):
+		self.maxbytes = maxbytes
+		self.size = 0
+		self.entries = OrderedDict()
+		self.lock = Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.expirations = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	def get(self, key):
+		with self.lock:
+			entry = self.entries.get(key)
+			if entry is None:
+				self.misses += 1
+				return None
+			if entry[0] < monotonic():
+				self._remove(key)
+				self.expirations += 1
+				self.misses += 1
+				return None
+			self.entries.move_to_end(key)
+			self.hits += 1
+			return entry[2]
+
+	def set(self, key, value, size, ttl):
+		if size > self.maxbytes or ttl <= 0: return
+		with self.lock:
+			if key in self.entries: self._remove(key)
+			self.entries[key] = (monotonic() + ttl, size, value)
+			self.size += size
+			while self.size > self.maxbytes:
+				self._remove(next(iter(self.entries)))
+				self.evictions += 1
+
+	def pop(self, key):
+		with self.lock:
+			if key not in self.entries: return None
+			return self._remove(key)
+
+	def _remove(self, key):
+		_, size, value = self.entries.pop(key)
+		self.size -= size
+		return value
+
+	def stats(self):
+		total = self.hits + self.misses
+		return {
+			"size": len(self.entries),
+			"bytes": self.size,
+			"maxbytes": self.maxbytes,
+			"hits": self.hits,
+			"misses": self.misses,
+			"evictions": self.evictions,
+			"expirations": self.expirations,
+			"ratio": 0 if total == 0 else self.hits / total
+		}
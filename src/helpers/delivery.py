@@ -0,0 +1,90 @@
+from time import monotonic
+from asyncio import Queue, sleep, run_coroutine_threadsafe, CancelledError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from traceback import format_exc
+
+from helpers.metrics import Histogram
+
+
+QUEUE_SIZE = 500
+WORKER_COUNT = 4
+# Minimum number of seconds between two deliveries of the same worker, which caps the rate at which a backlog is drained
+DELIVERY_INTERVAL = 0.2
+# Maximum number of seconds the snapshot listener thread waits for a free slot before the message is dropped
+SUBMIT_TIMEOUT = 5
+DELIVERY_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300]
+
+
+class DeliveryQueue(object):
+	def __init__(self, handler, maxsize=QUEUE_SIZE, workers=WORKER_COUNT, interval=DELIVERY_INTERVAL):
+		self.handler = handler
+		self.maxsize = maxsize
+		self.workerCount = workers
+		self.interval = interval
+		self.queue = None
+		self.workers = []
+		self.pending = set()
+		self.latency = Histogram(buckets=DELIVERY_BUCKETS)
+		self.enqueued = 0
+		self.duplicates = 0
+		self.dropped = 0
+		self.delivered = 0
+		self.failed = 0
+
+	def start(self, loop):
+		self.queue = Queue(maxsize=self.maxsize)
+		self.workers = [loop.create_task(self.work()) for _ in range(self.workerCount)]
+
+	def submit(self, loop, key, item, timeout=SUBMIT_TIMEOUT):
+		# Called from the snapshot listener thread, it waits for a free slot so that a large backlog is handed over gradually, but
+		# never indefinitely, as a stopped loop or stuck workers would otherwise stall every snapshot that follows
+		try:
+			future = run_coroutine_threadsafe(self.put(key, item), loop)
+		except RuntimeError:
+			self.dropped += 1
+			return
+		try:
+			future.result(timeout=timeout)
+		except FutureTimeoutError:
+			future.cancel()
+			self.dropped += 1
+
+	async def put(self, key, item):
+		# A message that's modified while still queued is delivered only once
+		if key in self.pending:
+			self.duplicates += 1
+			return
+		self.pending.add(key)
+		try:
+			await self.queue.put((key, item, monotonic()))
+		except CancelledError:
+			self.pending.discard(key)
+			raise
+		self.enqueued += 1
+
+	async def work(self):
+		while True:
+			key, item, enqueuedAt = await self.queue.get()
+			try:
+				await self.handler(key, item)
+				self.delivered += 1
+			except:
+				self.failed += 1
+				print(format_exc())
+			finally:
+				self.pending.discard(key)
+				self.latency.observe((), monotonic() - enqueuedAt)
+				self.queue.task_done()
+			await sleep(self.interval)
+
+	def stats(self):
+		return {
+			"depth": 0 if self.queue is None else self.queue.qsize(),
+			"maxsize": self.maxsize,
+			"inflight": len(self.pending),
+			"enqueued": self.enqueued,
+			"duplicates": self.duplicates,
+			"dropped": self.dropped,
+			"delivered": self.delivered,
+			"failed": self.failed
+		}
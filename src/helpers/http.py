@@ -0,0 +1,60 @@
+from time import monotonic
+from types import SimpleNamespace
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig
+
+from helpers.metrics import Histogram
+
+
+CONNECTION_LIMIT = 100
+CONNECTION_LIMIT_PER_HOST = 20
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+REQUEST_TIMEOUT = ClientTimeout(total=20, connect=5)
+
+
+class HTTPClient(object):
+	def __init__(self):
+		self._session = None
+		self.timings = Histogram()
+		self.requests = 0
+		self.failures = 0
+
+	@property
+	def session(self):
+		# Created on first use, since a session has to be bound to the running loop
+		if self._session is None or self._session.closed:
+			traceConfig = TraceConfig(trace_config_ctx_factory=lambda trace_request_ctx: SimpleNamespace(start=None))
+			traceConfig.on_request_start.append(self.on_request_start)
+			traceConfig.on_request_end.append(self.on_request_end)
+			traceConfig.on_request_exception.append(self.on_request_exception)
+			connector = TCPConnector(limit=CONNECTION_LIMIT, limit_per_host=CONNECTION_LIMIT_PER_HOST, ttl_dns_cache=DNS_CACHE_TTL, keepalive_timeout=KEEPALIVE_TIMEOUT)
+			self._session = ClientSession(connector=connector, timeout=REQUEST_TIMEOUT, trace_configs=[traceConfig])
+		return self._session
+
+	def get(self, url, **kwargs):
+		return self.session.get(url, **kwargs)
+
+	def post(self, url, **kwargs):
+		return self.session.post(url, **kwargs)
+
+	async def on_request_start(self, session, context, params):
+		context.start = monotonic()
+		self.requests += 1
+
+	async def on_request_end(self, session, context, params):
+		self.timings.observe((("host", params.url.host), ("status", params.response.status)), monotonic() - context.start)
+
+	async def on_request_exception(self, session, context, params):
+		self.failures += 1
+		self.timings.observe((("host", params.url.host), ("status", "error")), monotonic() - context.start)
+
+	async def close(self):
+		if self._session is not None and not self._session.closed:
+			await self._session.close()
+
+	def stats(self):
+		return {
+			"requests": self.requests,
+			"failures": self.failures
+		}
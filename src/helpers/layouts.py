@@ -0,0 +1,53 @@
+from threading import Lock
+
+
+class LayoutRegistry(object):
+	def __init__(self):
+		self.guilds = {}
+		self.documents = {}
+		self.lock = Lock()
+		self.ready = False
+
+	def __len__(self):
+		return len(self.documents)
+
+	def update(self, changes):
+		# Called from the snapshot listener thread
+		with self.lock:
+			for change in changes:
+				self._remove(change.document.id)
+				if change.type.name == "REMOVED": continue
+				layout = change.document.to_dict()
+				guildId, label = layout.get("guildId"), layout.get("label")
+				if guildId is None or label is None: continue
+				self.guilds.setdefault(guildId, {})[label] = (change.document.id, layout)
+				self.documents[change.document.id] = (guildId, label)
+			self.ready = True
+
+	def _remove(self, documentId):
+		entry = self.documents.pop(documentId, None)
+		if entry is None: return
+		guildId, label = entry
+		layouts = self.guilds.get(guildId, {})
+		# Another document may have taken over the same label in the meantime
+		if layouts.get(label, (None,))[0] == documentId: layouts.pop(label)
+		if len(layouts) == 0: self.guilds.pop(guildId, None)
+
+	def labels(self, guildId):
+		with self.lock:
+			return list(self.guilds.get(str(guildId), {}).keys())
+
+	def get(self, guildId, label):
+		with self.lock:
+			entry = self.guilds.get(str(guildId), {}).get(label)
+			return None if entry is None else dict(entry[1])
+
+	def stats(self):
+		return {
+			"ready": self.ready,
+			"guilds": len(self.guilds),
+			"layouts": len(self.documents)
+		}
+
+
+layoutRegistry = LayoutRegistry()
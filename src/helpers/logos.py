@@ -0,0 +1,71 @@
+from os import environ
+from time import time
+from asyncio import ensure_future
+from urllib.parse import quote
+from traceback import format_exc
+
+from helpers.cache import TTLCache
+from helpers.processing import SingleFlight
+
+
+LOGO_TTL = 7 * 24 * 60 * 60
+MISSING_LOGO_TTL = 24 * 60 * 60
+
+
+class LogoCache(object):
+	def __init__(self, database, path="discord/properties/logos", ttl=LOGO_TTL, maxsize=20000):
+		self.database = database
+		self.path = path
+		self.cache = TTLCache(ttl=ttl, maxsize=maxsize)
+		self.flights = SingleFlight()
+
+	def document(self, key):
+		# Keys contain the exchange name, which may include characters that aren't allowed in document ids
+		return self.database.document(f"{self.path}/{quote(key, safe='')}")
+
+	async def load(self, key):
+		# Logos persisted by previous runs are read one at a time on a miss, so a restart doesn't spend credits on them again
+		try:
+			document = await self.document(key).get()
+			if document.exists: return document.to_dict().get("url")
+		except:
+			print(format_exc())
+		return None
+
+	async def persist(self, key, thumbnailUrl):
+		try: await self.document(key).set({"key": key, "url": thumbnailUrl, "timestamp": time()})
+		except: print(format_exc())
+
+	async def get(self, http, ticker):
+		symbol = ticker.get("symbol")
+		exchange = ticker["exchange"].get("name") if ticker["exchange"].get("id") not in [None, "forex"] else None
+		assetType = ticker["metadata"]["type"]
+		key = f"{symbol}|{exchange}|{assetType}"
+		cached = self.cache.get(key)
+		if cached is not None: return cached or None
+		return await self.flights.run(key, lambda: self.fetch(http, key, symbol, exchange, assetType))
+
+	async def fetch(self, http, key, symbol, exchange, assetType):
+		if self.path is not None:
+			thumbnailUrl = await self.load(key)
+			if thumbnailUrl:
+				self.cache.set(key, thumbnailUrl)
+				return thumbnailUrl
+
+		if exchange is not None:
+			url = f"https://api.twelvedata.com/logo?apikey={environ['TWELVEDATA_KEY']}&interval=1min&type={assetType.replace(' ', '%20')}&format=JSON&symbol={symbol}&exchange={exchange}"
+		else:
+			url = f"https://api.twelvedata.com/logo?apikey={environ['TWELVEDATA_KEY']}&interval=1min&type={assetType.replace(' ', '%20')}&format=JSON&symbol={symbol}"
+		async with http.get(url) as resp:
+			response = await resp.json()
+			thumbnailUrl = response.get("url")
+
+		if response.get("status") == "error": return None
+		# Missing logos are cached as an empty string, so they aren't requested over and over either
+		self.cache.set(key, thumbnailUrl or "", ttl=None if thumbnailUrl else MISSING_LOGO_TTL)
+		# Persisting isn't needed for the response, so it doesn't hold it up
+		if self.path is not None and thumbnailUrl: ensure_future(self.persist(key, thumbnailUrl))
+		return thumbnailUrl
+
+	def stats(self):
+		return self.cache.stats()
@@ -0,0 +1,111 @@
+from time import monotonic
+from bisect import bisect_left
+from traceback import format_exc
+
+from aiohttp import web
+
+
+METRICS_PORT = 6910
+LATENCY_STAGES = ["acknowledgement", "database", "prelight", "parser", "request", "response"]
+LATENCY_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+# The loop is considered stuck if the loop monitor saw no heartbeat for this many seconds. The endpoint is served by the very
+# loop it reports on, so a stalled loop can't answer at all: the probe's timeout has to exceed the monitor's stall threshold,
+# otherwise stalls too short to be recorded already fail the probe, and longer ones show up as probe timeouts.
+LIVENESS_TIMEOUT = 30
+
+
+class Histogram(object):
+	def __init__(self, buckets=LATENCY_BUCKETS):
+		self.buckets = buckets
+		self.series = {}
+
+	def observe(self, labels, value):
+		counts, total = self.series.get(labels, (None, None))
+		if counts is None:
+			counts = [0] * (len(self.buckets) + 1)
+			total = [0.0, 0]
+			self.series[labels] = (counts, total)
+		counts[bisect_left(self.buckets, value)] += 1
+		total[0] += value
+		total[1] += 1
+
+	def render(self, name):
+		lines = [f"# TYPE {name} histogram"]
+		for labels, (counts, total) in self.series.items():
+			labelText = ",".join([f'{k}="{v}"' for k, v in labels])
+			cumulative = 0
+			for bound, count in zip(self.buckets + ["+Inf"], counts):
+				cumulative += count
+				lines.append(f'{name}_bucket{{{labelText + "," if labelText else ""}le="{bound}"}} {cumulative}')
+			lines.append(f"{name}_sum{{{labelText}}} {total[0]}")
+			lines.append(f"{name}_count{{{labelText}}} {total[1]}")
+		return lines
+
+
+class Metrics(object):
+	def __init__(self):
+		self.latency = Histogram()
+		self.histograms = {"alpha_request_stage_seconds": self.latency}
+		self.inflight = set()
+		self.sources = {}
+		# Fed by the loop monitor's heartbeat
+		self.loopLag = 0.0
+
+	def register(self, name, stats):
+		# Sources are callables returning a flat dict, like the stats() methods of caches and queues
+		self.sources[name] = stats
+
+	def register_histogram(self, name, histogram):
+		self.histograms[name] = histogram
+
+	def observe_request(self, command, telemetry):
+		for stage in LATENCY_STAGES:
+			value = telemetry.get(stage)
+			if value is None: continue
+			self.latency.observe((("command", command), ("stage", stage)), value)
+
+	def render(self):
+		lines = []
+		for name, histogram in self.histograms.items():
+			lines += histogram.render(name)
+		lines += ["# TYPE alpha_inflight_interactions gauge", f"alpha_inflight_interactions {len(self.inflight)}"]
+		lines += ["# TYPE alpha_event_loop_lag_seconds gauge", f"alpha_event_loop_lag_seconds {self.loopLag}"]
+		for name, stats in self.sources.items():
+			try: values = stats()
+			except:
+				print(format_exc())
+				continue
+			for key, value in values.items():
+				if isinstance(value, bool): value = int(value)
+				if not isinstance(value, (int, float)): continue
+				lines.append(f'alpha_{key.lower()}{{source="{name}"}} {value}')
+		return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+async def start_server(isReady, health, port=METRICS_PORT):
+	async def liveness(request):
+		# Reports the loop monitor's watchdog state, which keeps being updated from its own thread while the loop is blocked
+		state = health()
+		summary = f"last heartbeat {state['heartbeatAge']:.2f}s ago, {state['stalls']} stalls, longest {state['longestStall']:.2f}s"
+		if not state["watching"]:
+			return web.Response(status=503, text=f"loop monitor stopped, {summary}")
+		if state["heartbeatAge"] > LIVENESS_TIMEOUT:
+			return web.Response(status=503, text=f"event loop stalled, {summary}")
+		return web.Response(text=f"ok, {summary}")
+
+	async def readiness(request):
+		if not isReady(): return web.Response(status=503, text="not ready")
+		return web.Response(text="ok")
+
+	async def export(request):
+		return web.Response(text=metrics.render(), content_type="text/plain")
+
+	app = web.Application()
+	app.add_routes([web.get("/healthz", liveness), web.get("/readyz", readiness), web.get("/metrics", export)])
+	runner = web.AppRunner(app, access_log=None)
+	await runner.setup()
+	await web.TCPSite(runner, "0.0.0.0", port).start()
+	return runner
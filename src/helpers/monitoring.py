@@ -0,0 +1,86 @@
+from os import environ
+from sys import _current_frames
+from time import monotonic, sleep as block
+from asyncio import sleep
+from threading import Thread, get_ident
+from traceback import format_stack, format_exc
+
+from helpers.metrics import metrics
+
+
+HEARTBEAT_INTERVAL = 0.1
+# Loop blocked for longer than this many seconds is recorded as a stall
+STALL_THRESHOLD = 0.5
+# Minimum number of seconds between two stall reports
+REPORT_INTERVAL = 600
+
+
+class LoopMonitor(object):
+	def __init__(self, logging, threshold=STALL_THRESHOLD, reportInterval=REPORT_INTERVAL):
+		self.logging = logging
+		self.threshold = threshold
+		self.reportInterval = reportInterval
+		self.loopThread = None
+		self.watcher = None
+		self.lastBeat = monotonic()
+		self.stalls = {}
+		self.stallCount = 0
+		self.longestStall = 0.0
+		self.lastReport = monotonic()
+
+	async def heartbeat(self):
+		self.loopThread = get_ident()
+		self.watcher = Thread(target=self.watch, name="loop-monitor", daemon=True)
+		self.watcher.start()
+		self.lastBeat = monotonic()
+		while True:
+			await sleep(HEARTBEAT_INTERVAL)
+			now = monotonic()
+			# The heartbeat is also the only loop lag sampler, the exported gauge reads from it
+			metrics.loopLag = max(0.0, now - self.lastBeat - HEARTBEAT_INTERVAL)
+			self.lastBeat = now
+
+	def watch(self):
+		while True:
+			block(self.threshold / 2)
+			try:
+				stalledSince = self.lastBeat
+				if monotonic() - stalledSince > self.threshold:
+					self.record(stalledSince)
+				if monotonic() - self.lastReport > self.reportInterval:
+					self.report()
+			except:
+				print(format_exc())
+
+	def record(self, stalledSince):
+		# Capture the loop's stack while it's still blocked, so the stall is attributed to the code that caused it
+		frame = _current_frames().get(self.loopThread)
+		if frame is None: return
+		stack = "".join(format_stack(frame)[-8:])
+		count, longest = self.stalls.get(stack, (0, 0.0))
+
+		# Wait for the loop to come back to measure the whole stall
+		while self.lastBeat == stalledSince:
+			block(self.threshold / 10)
+		duration = self.lastBeat - stalledSince - HEARTBEAT_INTERVAL
+
+		self.stalls[stack] = (count + 1, max(longest, duration))
+		self.stallCount += 1
+		self.longestStall = max(self.longestStall, duration)
+
+	def report(self):
+		self.lastReport = monotonic()
+		if len(self.stalls) == 0: return
+		stalls, self.stalls = self.stalls, {}
+		worst = sorted(stalls.items(), key=lambda e: e[1][1], reverse=True)[:3]
+		message = "\n\n".join([f"Event loop blocked {count} times, up to {longest:.2f} seconds, in:\n{stack}" for stack, (count, longest) in worst])
+		print(f"[Monitoring]: {message}")
+		if environ["PRODUCTION"]: self.logging.report(message)
+
+	def stats(self):
+		return {
+			"stalls": self.stallCount,
+			"longestStall": self.longestStall,
+			"heartbeatAge": monotonic() - self.lastBeat,
+			"watching": self.watcher is not None and self.watcher.is_alive()
+		}
@@ -0,0 +1,91 @@
+from os import environ
+from time import monotonic
+from asyncio import gather
+from traceback import format_exc
+
+from helpers.processing import SingleFlight
+
+
+# Number of seconds after which movers are refreshed, and after which unused categories stop being refreshed
+REFRESH_INTERVAL = 300
+IDLE_TIMEOUT = 3600
+COINGECKO_PAGES = 4
+MOVERS_COUNT = 9
+
+
+class MarketMovers(object):
+	def __init__(self, http):
+		self.http = http
+		self.entries = {}
+		self.rankings = {}
+		self.lastRequested = {}
+		self.flights = SingleFlight()
+		self.refreshes = 0
+		self.failures = 0
+
+	async def get(self, market, direction, limit=250):
+		key = "crypto" if market == "crypto" else (market, direction)
+		self.lastRequested[key] = monotonic()
+		if key not in self.entries:
+			await self.flights.run(key, lambda: self.refresh(key))
+
+		if market == "crypto":
+			# Rankings only change on refresh, so they're computed once per direction and limit
+			rankingKey = (direction, max(10, limit))
+			if rankingKey not in self.rankings:
+				self.rankings[rankingKey] = self.rank(self.entries[key], direction, max(10, limit))
+			return self.rankings[rankingKey]
+		return self.entries[key]
+
+	def rank(self, assets, direction, limit):
+		response = []
+		for e in assets[:limit]:
+			if e.get("price_change_percentage_24h_in_currency", None) is not None:
+				response.append({"name": e["name"], "symbol": e["symbol"].upper(), "change": e["price_change_percentage_24h_in_currency"]})
+		return sorted(response, key=lambda k: k["change"], reverse=direction == "gainers")[:MOVERS_COUNT]
+
+	async def refresh(self, key):
+		try:
+			if key == "crypto":
+				pages = await gather(*[self.fetch_coingecko(page) for page in range(1, COINGECKO_PAGES + 1)])
+				self.entries[key] = [e for page in pages for e in page]
+				self.rankings = {}
+			else:
+				self.entries[key] = await self.fetch_twelvedata(*key)
+			self.refreshes += 1
+		except:
+			self.failures += 1
+			raise
+
+	async def fetch_coingecko(self, page):
+		url = f"https://pro-api.coingecko.com/api/v3/coins/markets?vs_currency=usd&order=market_cap_desc&per_page=250&page={page}&price_change_percentage=24h"
+		async with self.http.get(url, headers={"x-cg-pro-api-key": environ["COINGECKO_API_KEY"]}) as resp:
+			resp.raise_for_status()
+			return await resp.json()
+
+	async def fetch_twelvedata(self, market, direction):
+		url = f"https://api.twelvedata.com/market_movers/{market.replace(' ', '_')}?apikey={environ['TWELVEDATA_KEY']}&direction={direction}&outputsize=50"
+		async with self.http.get(url) as resp:
+			response = await resp.json()
+		assets = filter(
+			lambda e: not e['name'].lower().startswith("test") and "testfund" not in e['name'].lower().replace(" ", ""),
+			response["values"]
+		)
+		return [{"name": e["name"], "symbol": e["symbol"], "change": e["percent_change"]} for e in list(assets)[:MOVERS_COUNT]]
+
+	async def refresh_all(self):
+		# Only categories someone asked for recently are kept warm, the rest are fetched again on demand
+		for key, timestamp in list(self.lastRequested.items()):
+			if monotonic() - timestamp > IDLE_TIMEOUT:
+				self.lastRequested.pop(key, None)
+				self.entries.pop(key, None)
+				continue
+			try: await self.flights.run(key, lambda: self.refresh(key))
+			except: print(format_exc())
+
+	def stats(self):
+		return {
+			"categories": len(self.entries),
+			"refreshes": self.refreshes,
+			"failures": self.failures
+		}
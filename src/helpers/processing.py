@@ -0,0 +1,157 @@
+from re import fullmatch
+from io import BytesIO
+from time import monotonic
+from copy import deepcopy
+from asyncio import ensure_future, shield, gather, Semaphore
+from traceback import format_exc
+from orjson import dumps, OPT_SORT_KEYS
+
+from Processor import process_task as _process_task
+
+from helpers.cache import LRUCache, SizedTTLCache
+
+
+IMAGE_MODES = ["chart", "heatmap"]
+TIMEFRAME_UNITS = {"": 60, "s": 1, "m": 60, "min": 60, "h": 3600, "d": 86400, "w": 604800, "M": 2592000}
+
+# Maximum number of renders a single command can run at once, and across all commands
+REQUEST_CONCURRENCY = 4
+GLOBAL_CONCURRENCY = 16
+
+# Quote sources served from cache with their freshness and stale windows in seconds
+QUOTE_CACHE_PLATFORMS = {
+	"Twelvedata": (10, 60),
+	"CCXT": (3, 20),
+	"CoinGecko": (15, 90)
+}
+
+
+class SingleFlight(object):
+	def __init__(self):
+		self.inflight = {}
+		self.requests = 0
+		self.coalesced = 0
+
+	async def run(self, key, factory):
+		self.requests += 1
+		future = self.inflight.get(key)
+		if future is None:
+			future = ensure_future(factory())
+			self.inflight[key] = future
+			future.add_done_callback(lambda _: self.inflight.pop(key, None))
+		else:
+			self.coalesced += 1
+		# Shield the shared call, so that a cancelled caller doesn't cancel it for everyone else
+		return await shield(future)
+
+	def stats(self):
+		return {
+			"inflight": len(self.inflight),
+			"requests": self.requests,
+			"coalesced": self.coalesced,
+			"ratio": 0 if self.requests == 0 else self.coalesced / self.requests
+		}
+
+
+taskFlights = SingleFlight()
+# Rendered images are cached by size, the budget is set per process on startup and disabled until then
+imageCache = SizedTTLCache(maxbytes=0)
+quoteCache = LRUCache(maxsize=5000)
+quoteStats = {"fresh": 0, "stale": 0, "refreshes": 0}
+globalLimit = Semaphore(GLOBAL_CONCURRENCY)
+
+
+def get_task_key(task, mode, origin):
+	try: return mode + str(origin) + dumps(task, option=OPT_SORT_KEYS).decode()
+	except: return None
+
+def get_timeframe_seconds(timeframe):
+	match = fullmatch(r"(\d*)\s*([a-zA-Z]*)", str(timeframe).strip())
+	if match is None: return None
+	count, unit = match.groups()
+	# Only months are denoted with an uppercase M, other units are case insensitive
+	multiplier = TIMEFRAME_UNITS.get(unit, TIMEFRAME_UNITS.get(unit.lower()))
+	if multiplier is None: return None
+	return (int(count) if count != "" else 1) * multiplier
+
+def get_image_ttl(task):
+	# A one minute chart stays fresh for seconds, a daily chart for minutes
+	timeframe = task.get(task.get("currentPlatform"), {}).get("currentTimeframe")
+	seconds = None if timeframe is None else get_timeframe_seconds(timeframe)
+	if seconds is None: return 30
+	return min(max(seconds / 60, 5), 300)
+
+def copy_payload(payload):
+	if payload is None: return None
+	payload = dict(payload)
+	if hasattr(payload.get("data"), "getvalue"):
+		payload["data"] = BytesIO(payload["data"].getvalue())
+	return payload
+
+async def process_task(task, mode, origin="default", **kwargs):
+	key = get_task_key(task, mode, origin)
+	if key is None:
+		return await _process_task(task, mode, origin=origin, **kwargs)
+
+	if mode in IMAGE_MODES:
+		cached = imageCache.get(key)
+		if cached is not None:
+			payload, data = cached
+			return {**payload, "data": BytesIO(data), "cached": True}, None
+
+	async def execute():
+		payload, responseMessage = await _process_task(task, mode, origin=origin, **kwargs)
+		if payload is not None and mode in IMAGE_MODES and hasattr(payload.get("data"), "getvalue"):
+			data = payload["data"].getvalue()
+			imageCache.set(key, ({k: v for k, v in payload.items() if k != "data"}, data), len(data), get_image_ttl(task))
+		elif payload is not None and mode == "quote" and payload.get("platform") in QUOTE_CACHE_PLATFORMS:
+			quoteCache.set(key, (monotonic(), payload))
+		return payload, responseMessage
+
+	async def refresh():
+		try: await taskFlights.run(key, execute)
+		except: print(format_exc())
+
+	if mode == "quote":
+		cached = quoteCache.get(key)
+		if cached is not None:
+			timestamp, payload = cached
+			freshness, staleness = QUOTE_CACHE_PLATFORMS[payload["platform"]]
+			age = monotonic() - timestamp
+			if age < freshness:
+				quoteStats["fresh"] += 1
+				return {**payload, "cached": True}, None
+			elif age < staleness:
+				# Serve the last known quote while a single background request revalidates it
+				if key not in taskFlights.inflight:
+					quoteStats["refreshes"] += 1
+					ensure_future(refresh())
+				quoteStats["stale"] += 1
+				return {**payload, "cached": True, "stale": True}, None
+
+	payload, responseMessage = await taskFlights.run(key, execute)
+	# Every caller gets its own payload, since rendered images are file objects consumed on upload
+	return copy_payload(payload), responseMessage
+
+def expand_timeframes(task):
+	timeframes = task.pop("timeframes")
+	jobs = []
+	for i in range(task.get("requestCount")):
+		job = deepcopy(task)
+		for p, t in timeframes.items(): job[p]["currentTimeframe"] = t[i]
+		jobs.append(job)
+	return jobs
+
+async def process_tasks(tasks, mode, origin="default", limit=REQUEST_CONCURRENCY, callback=None, **kwargs):
+	requestLimit = Semaphore(limit)
+
+	async def execute(index, task):
+		async with requestLimit, globalLimit:
+			result = await process_task(task, mode, origin=origin, **kwargs)
+		# Callbacks receive results as they complete, after the concurrency slots are released
+		if callback is not None:
+			await callback(index, result)
+		return result
+
+	# Results are returned in the same order as the tasks were passed in
+	return await gather(*[execute(i, task) for i, task in enumerate(tasks)])
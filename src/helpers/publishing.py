@@ -0,0 +1,76 @@
+from threading import Thread, Lock
+from queue import Queue, Full, Empty
+from traceback import format_exc
+from orjson import dumps
+
+from google.cloud import pubsub_v1
+
+
+# Batches are sent once any of the limits is reached: message count, bytes or seconds
+BATCH_SETTINGS = pubsub_v1.types.BatchSettings(max_messages=100, max_bytes=512 * 1024, max_latency=1.0)
+QUEUE_SIZE = 10000
+
+
+class EventPublisher(object):
+	def __init__(self, maxsize=QUEUE_SIZE, batchSettings=BATCH_SETTINGS):
+		self.client = pubsub_v1.PublisherClient(batch_settings=batchSettings)
+		self.queue = Queue(maxsize=maxsize)
+		self.lock = Lock()
+		self.worker = None
+		self.submitted = 0
+		self.published = 0
+		self.failed = 0
+		self.dropped = 0
+		self.highWatermark = 0
+
+	def publish(self, topic, message):
+		# Called from the event loop, so it never blocks: events are dropped when the queue is full
+		if self.worker is None: self.start()
+		try:
+			self.queue.put_nowait((topic, message))
+			self.submitted += 1
+			self.highWatermark = max(self.highWatermark, self.queue.qsize())
+		except Full:
+			self.dropped += 1
+
+	def start(self):
+		with self.lock:
+			if self.worker is not None: return
+			self.worker = Thread(target=self.run, name="event-publisher", daemon=True)
+			self.worker.start()
+
+	def run(self):
+		while True:
+			try: item = self.queue.get(timeout=1.0)
+			except Empty: continue
+			if item is None: return
+			topic, message = item
+			try:
+				future = self.client.publish(topic, dumps(message))
+				future.add_done_callback(self.on_published)
+			except:
+				self.failed += 1
+				print(format_exc())
+
+	def on_published(self, future):
+		if future.exception() is None: self.published += 1
+		else: self.failed += 1
+
+	def stop(self, timeout=10.0):
+		if self.worker is None: return
+		try: self.queue.put(None, timeout=timeout)
+		except Full: pass
+		self.worker.join(timeout)
+		# Sends all pending batches before returning
+		self.client.stop()
+
+	def stats(self):
+		return {
+			"queued": self.queue.qsize(),
+			"maxsize": self.queue.maxsize,
+			"highWatermark": self.highWatermark,
+			"submitted": self.submitted,
+			"published": self.published,
+			"failed": self.failed,
+			"dropped": self.dropped
+		}
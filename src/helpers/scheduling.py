@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from parsedatetime import Calendar
+
+from helpers.cache import LRUCache
+
+
+DATE_FORMAT = "%b %d %Y %H:%M"
+MARKET_TIMEZONE = "America/New_York"
+MARKET_OPEN = (9, 30)
+# Boundaries suggested when no period was picked yet, in minutes
+DEFAULT_BOUNDARIES = [15, 60, 1440]
+
+cal = Calendar()
+parsedDates = LRUCache(maxsize=5000)
+candidateDates = LRUCache(maxsize=100)
+marketTimezone = None
+
+
+def current_minute():
+	return datetime.now(timezone.utc).replace(tzinfo=None, second=0, microsecond=0)
+
+def format_date(date):
+	return date.strftime(DATE_FORMAT) + " UTC"
+
+def next_boundary(now, minutes):
+	elapsed = now.hour * 60 + now.minute
+	return now.replace(hour=0, minute=0) + timedelta(minutes=(elapsed // minutes + 1) * minutes)
+
+def get_market_timezone():
+	# Resolved on first use, so missing timezone data only costs the market open suggestion instead of the startup
+	global marketTimezone
+	if marketTimezone is None:
+		try: marketTimezone = ZoneInfo(MARKET_TIMEZONE)
+		except ZoneInfoNotFoundError: marketTimezone = False
+	return marketTimezone
+
+def next_market_open(now):
+	marketTimezone = get_market_timezone()
+	if not marketTimezone: return None
+	local = now.replace(tzinfo=timezone.utc).astimezone(marketTimezone)
+	candidate = local.replace(hour=MARKET_OPEN[0], minute=MARKET_OPEN[1])
+	if candidate <= local: candidate += timedelta(days=1)
+	while candidate.weekday() >= 5: candidate += timedelta(days=1)
+	# Re-localize after moving across days, so that daylight saving changes are accounted for
+	candidate = candidate.replace(tzinfo=None).replace(tzinfo=marketTimezone)
+	return candidate.astimezone(timezone.utc).replace(tzinfo=None)
+
+def parse_date(text, now):
+	# Relative inputs like "in 2 hours" depend on the current time, so results are only reused within the same minute
+	key = (text, now)
+	cached = parsedDates.get(key)
+	if cached is not None: return cached
+
+	timeStructs, status = cal.parse(text, sourceTime=now)
+	if status == 0:
+		parsed = ""
+	else:
+		parsed = datetime(*timeStructs[:5])
+		if parsed < now: parsed += timedelta(days=1)
+		parsed = format_date(parsed)
+	parsedDates.set(key, parsed)
+	return parsed
+
+def get_candidates(now, period=None):
+	key = (now, period)
+	cached = candidateDates.get(key)
+	if cached is not None: return cached
+
+	boundaries = DEFAULT_BOUNDARIES if period is None else [period]
+	marketOpen = next_market_open(now)
+	candidates = [format_date(now)] + [format_date(next_boundary(now, minutes)) for minutes in boundaries] + ([] if marketOpen is None else [format_date(marketOpen)])
+	candidates = list(dict.fromkeys(candidates))
+	candidateDates.set(key, candidates)
+	return candidates
+
+def suggest_dates(text, period=None):
+	now = current_minute()
+	candidates = get_candidates(now, period)
+	if text == "": return candidates
+
+	parsed = parse_date(text, now)
+	if parsed == "": return [e for e in candidates if text in e.lower()]
+	return [parsed] + [e for e in candidates if e != parsed]
@@ -0,0 +1,41 @@
+from threading import Lock
+
+from google.cloud.firestore import Increment
+
+
+class StatisticsAggregator(object):
+	def __init__(self, database, path="discord/statistics"):
+		self.database = database
+		self.path = path
+		self.counters = {}
+		self.lock = Lock()
+		self.flushes = 0
+		self.failures = 0
+
+	def increment(self, snapshot, key, value=1):
+		with self.lock:
+			counters = self.counters.setdefault(snapshot, {})
+			counters[key] = counters.get(key, 0) + value
+
+	async def flush(self):
+		with self.lock:
+			if len(self.counters) == 0: return
+			counters, self.counters = self.counters, {}
+
+		try:
+			await self.database.document(self.path).set({snapshot: {key: Increment(value) for key, value in values.items()} for snapshot, values in counters.items()}, merge=True)
+			self.flushes += 1
+		except:
+			# Put the counters back, so that they're included in the next flush
+			self.failures += 1
+			for snapshot, values in counters.items():
+				for key, value in values.items():
+					self.increment(snapshot, key, value)
+			raise
+
+	def stats(self):
+		return {
+			"pending": sum([len(values) for values in self.counters.values()]),
+			"flushes": self.flushes,
+			"failures": self.failures
+		}